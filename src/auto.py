@@ -195,7 +195,8 @@ def auto_ingest(db=None) -> dict:
     Returns {"sessions": int, "messages": int, "new_session_ids": [...], "updated_session_ids": [...]}.
     """
     from src.config import default_config
-    from src.entities import extract_entities_for_session
+    from src.entities import extract_entities_for_sessions
+    from src.parsers.base import file_signature
     from src.parsers.codex import CodexParser
     from src.parsers.claude_code import ClaudeCodeParser
     from src.parsers.gemini import GeminiParser
@@ -216,13 +217,44 @@ def auto_ingest(db=None) -> dict:
     messages = 0
     new_session_ids = []
     updated_session_ids = []
+    # Skip files whose (mtime, size) match the last ingest
+    parse_cache = db.get_parse_cache()
+    parsed_files: list[tuple[str, float, int, str | None, int]] = []
     for _source_name, parser, paths in sources:
-        files = parser.discover_files(paths)
-        for fpath in files:
-            try:
-                parsed = parser.parse(fpath)
-            except Exception:
+        changed = []
+        signatures = {}
+        # Grown files with a resume offset from the last parse: parse just
+        # the new bytes on top of the stored session
+        results = []
+        for fpath in parser.discover_files(paths):
+            sig = file_signature(fpath)
+            entry = parse_cache.get(str(fpath))
+            if entry and sig == entry[:2]:
+                continue
+            signatures[fpath] = sig
+            base = None
+            if entry and entry[2] and entry[3] and sig and sig[1] >= entry[3]:
+                base = db.get_session(entry[2])
+            if base is None:
+                changed.append(fpath)
                 continue
+            try:
+                results.append(
+                    (fpath, (parser.parse_incremental(fpath, entry[3], base), None))
+                )
+            except Exception as e:
+                results.append((fpath, (None, str(e))))
+        results.extend(zip(changed, parser.parse_all(changed)))
+
+        for fpath, (parsed, error) in results:
+            if not error and signatures[fpath]:
+                session_id = (
+                    parsed.id if parsed and parsed.user_message_count else None
+                )
+                offset = parsed.parsed_offset if session_id else 0
+                parsed_files.append(
+                    (str(fpath), *signatures[fpath], session_id, offset)
+                )
             if not parsed or parsed.user_message_count == 0:
                 continue
 
@@ -236,7 +268,6 @@ def auto_ingest(db=None) -> dict:
             if status == "new":
                 msg_dicts = [m.to_dict(parsed.id) for m in parsed.messages]
                 db.insert_messages(msg_dicts)
-                extract_entities_for_session(db, parsed.id)
                 sessions += 1
                 messages += len(parsed.messages)
                 new_session_ids.append(parsed.id)
@@ -244,9 +275,11 @@ def auto_ingest(db=None) -> dict:
                 # Re-insert messages (INSERT OR IGNORE handles duplicates)
                 msg_dicts = [m.to_dict(parsed.id) for m in parsed.messages]
                 db.insert_messages(msg_dicts)
-                extract_entities_for_session(db, parsed.id)
                 updated_session_ids.append(parsed.id)
 
+    extract_entities_for_sessions(db, new_session_ids + updated_session_ids)
+    db.record_parses(parsed_files)
+
     if new_session_ids:
         logger.info(f"Ingested {sessions} new sessions ({messages} messages)")
     if updated_session_ids:
@@ -349,12 +382,35 @@ def _run_self_test(db) -> bool:
 PROMOTE_WORKERS = 4
 
 
-def _promote_one(project_path: str, model=None, backend=None) -> dict:
+def _promote_one(project_path: str, model=None, backend=None, db_path=None) -> dict:
     """Promote a single project in its own DB connection (thread-safe)."""
+    from src.db import MemoryDB
     from src.promote import promote_project_knowledge
 
-    thread_db = _get_db()
-    return promote_project_knowledge(thread_db, project_path, model=model, backend=backend)
+    thread_db = MemoryDB(db_path) if db_path else _get_db()
+    try:
+        return promote_project_knowledge(thread_db, project_path, model=model, backend=backend)
+    finally:
+        thread_db.close()
+
+
+def _promote_many(project_paths, model=None, backend=None, db_path=None):
+    """Promote projects on PROMOTE_WORKERS threads.
+
+    Each project's LLM call blocks on a CLI subprocess, so the calls overlap
+    instead of running back to back.  Yields (project_path, result, error)
+    as projects finish; exactly one of result / error is None.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PROMOTE_WORKERS) as executor:
+        futures = {
+            executor.submit(_promote_one, p, model, backend, db_path): p
+            for p in project_paths
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
 
 
 def _get_promotable_projects(db) -> list[str]:
@@ -378,7 +434,7 @@ def daily_auto_process(db=None, model=None, backend=None) -> dict:
     3. Updated sessions → delete old summary → parallel re-summarize
     4. Backfill: catch up on ALL historical unsummarized quality sessions
     5. Parallel promote all eligible projects (>= 2 summaries)
-    6. Self-test and mark done
+    6. Merge the FTS index, self-test and mark done
     """
     if db is None:
         db = _get_db()
@@ -441,32 +497,29 @@ def daily_auto_process(db=None, model=None, backend=None) -> dict:
     promotable = _get_promotable_projects(db)
     if promotable:
         _notify(f"[daily-auto] Promoting {len(promotable)} projects ({PROMOTE_WORKERS} workers)...")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=PROMOTE_WORKERS) as executor:
-            futures = {
-                executor.submit(_promote_one, p, model, backend): p
-                for p in promotable
-            }
-            for future in concurrent.futures.as_completed(futures):
-                p = futures[future]
-                try:
-                    result = future.result()
-                    if result["entries"]:
-                        promoted_projects += 1
-                        promoted_confirmed += result["confirmed"]
-                        promoted_new += result["new"]
-                    _notify(
-                        f"[daily-auto]   {p}: "
-                        f"{len(result['entries'])} entries (confirmed={result['confirmed']}, new={result['new']})"
-                    )
-                except Exception as e:
-                    _notify(f"[daily-auto]   {p}: FAIL {e}")
+        for p, result, error in _promote_many(promotable, model, backend):
+            if error is not None:
+                _notify(f"[daily-auto]   {p}: FAIL {error}")
+                continue
+            if result["entries"]:
+                promoted_projects += 1
+                promoted_confirmed += result["confirmed"]
+                promoted_new += result["new"]
+            _notify(
+                f"[daily-auto]   {p}: "
+                f"{len(result['entries'])} entries (confirmed={result['confirmed']}, new={result['new']})"
+            )
 
         _notify(
             f"[daily-auto] Promoted {promoted_projects} projects "
             f"(confirmed {promoted_confirmed}, new {promoted_new})"
         )
 
-    # 6. Self-test
+    # 6. Maintenance, then self-test
+    try:
+        db.optimize()
+    except Exception as e:
+        _notify(f"[daily-auto] FTS optimize failed: {e}")
     _run_self_test(db)
 
     # 7. Mark daily run complete
@@ -495,8 +548,6 @@ def auto_process(db=None, model=None, backend=None, force=False) -> dict | None:
     Promote respects a 1-hour cooldown unless force=True.
     Returns stats dict.
     """
-    from src.promote import promote_project_knowledge
-
     if db is None:
         db = _get_db()
 
@@ -519,16 +570,17 @@ def auto_process(db=None, model=None, backend=None, force=False) -> dict | None:
             "WHERE project_path IS NOT NULL AND last_message_at >= ?",
             (thirty_days_ago,),
         ).fetchall()
-        for project_path, _project_name in rows:
-            try:
-                result = promote_project_knowledge(db, project_path, model=model, backend=backend)
-                if result["entries"]:
-                    promoted += len(result["entries"])
-                    promoted_confirmed += result["confirmed"]
-                    promoted_new += result["new"]
-                    promoted_projects += 1
-            except Exception as e:
-                logger.error(f"Failed to promote knowledge for {project_path}: {e}")
+        for project_path, result, error in _promote_many(
+            [r[0] for r in rows], model, backend, db_path=db.db_path
+        ):
+            if error is not None:
+                logger.error(f"Failed to promote knowledge for {project_path}: {error}")
+                continue
+            if result["entries"]:
+                promoted += len(result["entries"])
+                promoted_confirmed += result["confirmed"]
+                promoted_new += result["new"]
+                promoted_projects += 1
 
         _mark_promote_run()
 
@@ -597,8 +649,6 @@ def promote_background(model=None) -> None:
     def _run():
         global _bg_promote_running
         try:
-            from src.promote import promote_project_knowledge
-
             db = _get_db()
             thirty_days_ago = int(time.time()) - 30 * 86400
             rows = db.conn.execute(
@@ -606,11 +656,11 @@ def promote_background(model=None) -> None:
                 "WHERE project_path IS NOT NULL AND last_message_at >= ?",
                 (thirty_days_ago,),
             ).fetchall()
-            for project_path, _project_name in rows:
-                try:
-                    promote_project_knowledge(db, project_path, model=model)
-                except Exception as e:
-                    logger.error(f"Failed to promote {project_path}: {e}")
+            for project_path, _result, error in _promote_many(
+                [r[0] for r in rows], model, db_path=db.db_path
+            ):
+                if error is not None:
+                    logger.error(f"Failed to promote {project_path}: {error}")
             _mark_promote_run()
         except Exception as e:
             logger.error(f"Background promote failed: {e}")
@@ -12,7 +12,8 @@ from pathlib import Path
 
 from src.config import default_config
 from src.db import MemoryDB
-from src.entities import extract_entities_for_session
+from src.entities import extract_entities_for_sessions
+from src.parsers.base import file_signature
 from src.parsers.codex import CodexParser
 from src.parsers.claude_code import ClaudeCodeParser
 from src.parsers.gemini import GeminiParser
@@ -26,6 +27,10 @@ def get_db() -> MemoryDB:
     return db
 
 
+# Ingests storing at least this many messages merge the FTS index afterwards
+OPTIMIZE_MIN_MESSAGES = 10_000
+
+
 def _run_ingest(
     db: MemoryDB,
     source: str | None = None,
@@ -55,9 +60,12 @@ def _run_ingest(
 
     total_sessions = 0
     total_messages = 0
-    total_entities = 0
     total_skipped = 0
     per_source = []
+    ingested_ids: list[str] = []
+    # Files unchanged since the last ingest are skipped unless forced
+    parse_cache = {} if force else db.get_parse_cache()
+    parsed_files: list[tuple[str, float, int, str | None, int]] = []
 
     for source_name, parser, paths in sources:
         files = parser.discover_files(paths)
@@ -67,31 +75,52 @@ def _run_ingest(
         if verbose:
             print(f"\n[{source_name}] Found {len(files)} session files")
 
+        signatures = {f: file_signature(f) for f in files}
+        cached = {}
+        for f in files:
+            entry = parse_cache.get(str(f))
+            if entry and signatures[f] == entry[:2]:
+                cached[f] = entry[2]
+        results = parser.parse_all([f for f in files if f not in cached])
+
         for i, fpath in enumerate(files, 1):
-            # Parse
-            try:
-                parsed = parser.parse(fpath)
-            except Exception as e:
-                if verbose:
-                    print(f"  Error parsing {fpath.name}: {e}")
-                parsed = None
+            if fpath in cached:
+                if cached[fpath] is not None:
+                    source_existing += 1
+                    total_skipped += 1
+                parsed = error = None
+            else:
+                parsed, error = next(results)
+            if error and verbose:
+                print(f"  Error parsing {fpath.name}: {error}")
 
             # Process
+            stored = True
             if parsed:
                 if parsed.user_message_count == 0:
                     pass  # skip trivially empty sessions
                 elif db.session_exists(parsed.id) and not force:
                     source_existing += 1
                     total_skipped += 1
+                    # Not written back: leave the file to auto_ingest's
+                    # update check
+                    stored = False
                 else:
                     db.upsert_session(parsed.to_session_dict())
                     msg_dicts = [m.to_dict(parsed.id) for m in parsed.messages]
                     db.insert_messages(msg_dicts)
-                    entity_count = extract_entities_for_session(db, parsed.id)
-                    total_entities += entity_count
+                    ingested_ids.append(parsed.id)
                     source_new += 1
                     total_sessions += 1
                     total_messages += len(parsed.messages)
+            if fpath not in cached and stored and not error and signatures[fpath]:
+                session_id = (
+                    parsed.id if parsed and parsed.user_message_count else None
+                )
+                offset = parsed.parsed_offset if session_id else 0
+                parsed_files.append(
+                    (str(fpath), *signatures[fpath], session_id, offset)
+                )
 
             # Progress (always fires, regardless of skip/error)
             if i % 10 == 0 or i == len(files):
@@ -110,6 +139,11 @@ def _run_ingest(
             "existing": source_existing,
         })
 
+    total_entities = extract_entities_for_sessions(db, ingested_ids)
+    db.record_parses(parsed_files)
+    if total_messages >= OPTIMIZE_MIN_MESSAGES:
+        db.optimize()
+
     return {
         "sessions": total_sessions,
         "messages": total_messages,
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass, field
 from pathlib import Path
 
@@ -48,6 +49,27 @@ class Config:
     summarization_model: str = "claude-haiku-4-5-20251001"
     max_concurrent_jobs: int = 4
 
+    # On-disk cache of LLM responses (src.llm_cache); opt-in with LLM_CACHE=1
+    llm_cache_enabled: bool = field(
+        default_factory=lambda: os.environ.get("LLM_CACHE") == "1"
+    )
+    llm_cache_path: Path = field(
+        default_factory=lambda: Path(
+            os.environ.get("LLM_CACHE_PATH")
+            or Path.home() / ".tactical" / "llm_cache.sqlite"
+        ).expanduser()
+    )
+    llm_cache_ttl: int = field(
+        default_factory=lambda: _env_int("LLM_CACHE_TTL", 7 * 24 * 3600)
+    )
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
 
 def default_config() -> Config:
     return Config()
@@ -10,8 +10,24 @@ from pathlib import Path
 from typing import Any, Generator
 
 DEFAULT_DB_PATH = Path.home() / ".tactical" / "memory.sqlite"
-
-SCHEMA_VERSION = 1
+# Upper bound on the memory-mapped window over the DB file (256 MiB)
+MMAP_SIZE = 256 * 1024 * 1024
+
+SCHEMA_VERSION = 7
+
+# Parse cache: file stat signature at last ingest, so unchanged session files
+# can be skipped without re-parsing, and the byte offset an append-only file
+# was consumed up to, so a grown file can be parsed from there
+PARSE_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS parse_cache (
+    raw_path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    session_id TEXT,  -- NULL when the file held no ingestible session
+    parsed_offset INTEGER DEFAULT 0,  -- 0: no resumable offset
+    ingested_at INTEGER
+);
+"""
 
 SCHEMA_SQL = """
 -- Sessions: unified metadata from all CLI tools
@@ -33,7 +49,8 @@ CREATE TABLE IF NOT EXISTS sessions (
     tier TEXT DEFAULT 'L3',
     raw_path TEXT,
     ingested_at INTEGER,
-    title TEXT
+    title TEXT,
+    importance REAL DEFAULT 0  -- IMPORTANCE_SQL, refreshed on every upsert
 );
 
 -- Messages: normalized from all formats
@@ -78,7 +95,9 @@ CREATE TABLE IF NOT EXISTS entity_occurrences (
     entity_id INTEGER REFERENCES entities(id),
     session_id TEXT REFERENCES sessions(id),
     message_id INTEGER REFERENCES messages(id),
-    context_snippet TEXT,
+    context_snippet TEXT,  -- deprecated: rows written since v3 use ctx_start/ctx_end
+    ctx_start INTEGER,     -- snippet offsets into messages.content_text
+    ctx_end INTEGER,
     PRIMARY KEY(entity_id, message_id)
 );
 
@@ -111,6 +130,7 @@ CREATE TABLE IF NOT EXISTS memory_jobs (
     last_error TEXT
 );
 
+""" + PARSE_CACHE_SQL + """
 -- Schema version tracking
 CREATE TABLE IF NOT EXISTS schema_meta (
     key TEXT PRIMARY KEY,
@@ -133,24 +153,60 @@ END;
 CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
     INSERT INTO messages_fts(messages_fts, rowid, content_text) VALUES('delete', old.id, old.content_text);
 END;
-CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF content_text ON messages BEGIN
     INSERT INTO messages_fts(messages_fts, rowid, content_text) VALUES('delete', old.id, old.content_text);
     INSERT INTO messages_fts(rowid, content_text) VALUES (new.id, new.content_text);
 END;
 """
 
 INDEX_SQL = """
-CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id);
 CREATE INDEX IF NOT EXISTS idx_messages_role ON messages(session_id, role);
 CREATE INDEX IF NOT EXISTS idx_sessions_project ON sessions(project_path);
 CREATE INDEX IF NOT EXISTS idx_sessions_source ON sessions(source);
 CREATE INDEX IF NOT EXISTS idx_sessions_time ON sessions(first_message_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_l3_pending
+    ON sessions(first_message_at DESC) WHERE tier = 'L3';
 CREATE INDEX IF NOT EXISTS idx_entities_type ON entities(entity_type);
 CREATE INDEX IF NOT EXISTS idx_entity_occ_session ON entity_occurrences(session_id);
 CREATE INDEX IF NOT EXISTS idx_jobs_status ON memory_jobs(status, priority DESC);
 CREATE INDEX IF NOT EXISTS idx_project_knowledge_path ON project_knowledge(project_path);
 """
 
+# Session importance, precomputed at write time.  Must match
+# src.search.importance_score.
+IMPORTANCE_SQL = """(
+    MIN(COALESCE(message_count, 0) / 100.0, 1.0) * 0.3
+    + MIN(COALESCE(user_message_count, 0) / 20.0, 1.0) * 0.3
+    + MIN(COALESCE(total_tokens, 0) / 200000.0, 1.0) * 0.2
+    + MIN(COALESCE(compaction_count, 0) / 5.0, 1.0) * 0.2
+)"""
+
+# Schema migrations, keyed by the version they upgrade to.  Each script runs
+# once on databases created by an older version; FTS_SQL and INDEX_SQL are
+# re-applied afterwards, so dropped triggers/indexes get recreated.
+MIGRATIONS: dict[int, str] = {
+    # v2: only re-index FTS when content_text actually changes
+    2: "DROP TRIGGER IF EXISTS messages_au;",
+    # v3: entity context stored as offsets into the message, not copied text
+    3: """
+ALTER TABLE entity_occurrences ADD COLUMN ctx_start INTEGER;
+ALTER TABLE entity_occurrences ADD COLUMN ctx_end INTEGER;
+""",
+    # v4: importance is stored instead of recomputed per search
+    4: f"""
+ALTER TABLE sessions ADD COLUMN importance REAL DEFAULT 0;
+UPDATE sessions SET importance = {IMPORTANCE_SQL};
+""",
+    # v5: parse_cache gains parsed_offset; it is only a cache, so rebuild it
+    5: "DROP TABLE IF EXISTS parse_cache;" + PARSE_CACHE_SQL,
+    # v6: UNIQUE(session_id, ordinal) already indexes session_id lookups and
+    # serves ORDER BY ordinal; the single-column index only slowed inserts
+    6: "DROP INDEX IF EXISTS idx_messages_session;",
+    # v7: idx_sessions_l3_pending is keyed on first_message_at so it serves
+    # the ORDER BY of get_unsummarized_sessions
+    7: "DROP INDEX IF EXISTS idx_sessions_l3_pending;",
+}
+
 
 class MemoryDB:
     """Manages the life-long memory SQLite database."""
@@ -171,12 +227,17 @@ class MemoryDB:
             self._conn.execute("PRAGMA journal_mode=WAL")
             self._conn.execute("PRAGMA foreign_keys=ON")
             self._conn.execute("PRAGMA synchronous=NORMAL")
+            # Sorts/temp b-trees (ORDER BY, FTS merges) stay off disk, and
+            # reads of the main file go through a memory map
+            self._conn.execute("PRAGMA temp_store=MEMORY")
+            self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
         return self._conn
 
     def initialize(self) -> None:
         """Create all tables, indexes, and FTS."""
         cur = self.conn.cursor()
         cur.executescript(SCHEMA_SQL)
+        self._migrate(cur)
         cur.executescript(FTS_SQL)
         cur.executescript(INDEX_SQL)
         cur.execute(
@@ -185,11 +246,56 @@ class MemoryDB:
         )
         self.conn.commit()
 
+    def _migrate(self, cur: sqlite3.Cursor) -> None:
+        """Apply pending MIGRATIONS to a database created by an older version."""
+        row = cur.execute(
+            "SELECT value FROM schema_meta WHERE key = 'version'"
+        ).fetchone()
+        if row is None:
+            return  # fresh database, SCHEMA_SQL is already current
+        current = int(row[0])
+        for version in sorted(MIGRATIONS):
+            if version > current:
+                # executescript commits per statement otherwise; one explicit
+                # transaction keeps a step and its version bump together, so
+                # a crash mid-step never leaves it half-applied
+                try:
+                    cur.executescript(
+                        f"BEGIN;\n{MIGRATIONS[version]}\n"
+                        "INSERT OR REPLACE INTO schema_meta(key, value) "
+                        f"VALUES ('version', '{version}');\nCOMMIT;"
+                    )
+                except sqlite3.Error:
+                    if self.conn.in_transaction:
+                        self.conn.rollback()
+                    raise
+
     def close(self) -> None:
         if self._conn is not None:
             self._conn.close()
             self._conn = None
 
+    def optimize(self) -> None:
+        """Merge the FTS index into one segment and refresh planner stats.
+
+        Incremental inserts leave the FTS5 index in many small segments that
+        every MATCH has to consult.  The merge rewrites the whole index, so
+        run this after bulk loads or as periodic maintenance, not per insert.
+        """
+        with self.transaction() as cur:
+            cur.execute("INSERT INTO messages_fts(messages_fts) VALUES('optimize')")
+        self.conn.execute("PRAGMA optimize")
+
+    def data_version(self) -> tuple[int, int]:
+        """A token that changes whenever the database content may have changed.
+
+        ``PRAGMA data_version`` moves on commits made by other connections
+        (e.g. background summarize/promote workers); ``total_changes``
+        covers writes made through this one.
+        """
+        conn = self.conn
+        return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
     @contextmanager
     def transaction(self) -> Generator[sqlite3.Cursor, None, None]:
         cur = self.conn.cursor()
@@ -229,14 +335,15 @@ class MemoryDB:
                 """,
                 session,
             )
+            cur.execute(
+                f"UPDATE sessions SET importance = {IMPORTANCE_SQL} WHERE id = ?",
+                (session["id"],),
+            )
 
-    def insert_messages(self, messages: list[dict[str, Any]]) -> None:
-        """Bulk insert messages for a session."""
-        if not messages:
-            return
-        with self.transaction() as cur:
-            cur.executemany(
-                """INSERT OR IGNORE INTO messages (
+    # Batches at least this large are staged in a scratch DB first
+    SCRATCH_INGEST_MIN_ROWS = 2000
+
+    _INSERT_MESSAGE_SQL = """INSERT OR IGNORE INTO {table} (
                     session_id, ordinal, role, content_type,
                     content_text, content_json, tool_name,
                     token_count, created_at
@@ -244,9 +351,67 @@ class MemoryDB:
                     :session_id, :ordinal, :role, :content_type,
                     :content_text, :content_json, :tool_name,
                     :token_count, :created_at
-                )""",
-                messages,
+                )"""
+
+    def insert_messages(self, messages: list[dict[str, Any]]) -> None:
+        """Bulk insert messages for a session."""
+        if not messages:
+            return
+        if len(messages) >= self.SCRATCH_INGEST_MIN_ROWS:
+            self.ingest_via_scratch(messages)
+            return
+        self._insert_messages_direct(messages)
+
+    def _insert_messages_direct(self, messages: list[dict[str, Any]]) -> None:
+        with self.transaction() as cur:
+            cur.executemany(
+                self._INSERT_MESSAGE_SQL.format(table="messages"), messages
+            )
+
+    def ingest_via_scratch(self, messages: list[dict[str, Any]]) -> None:
+        """Insert messages by staging them in an attached in-memory DB.
+
+        Row binding and B-tree building happen in the scratch DB, which
+        needs no journaling.  The main DB then takes the write lock for one
+        INSERT ... SELECT merge instead of a long executemany.
+
+        ATTACH is not allowed inside a transaction, so with one already open
+        this falls back to a plain executemany rather than committing it.
+        """
+        conn = self.conn
+        if conn.in_transaction:
+            self._insert_messages_direct(messages)
+            return
+        conn.execute("ATTACH DATABASE ':memory:' AS scratch")
+        try:
+            conn.execute(
+                """CREATE TABLE scratch.messages (
+                    session_id TEXT, ordinal INTEGER, role TEXT,
+                    content_type TEXT, content_text TEXT, content_json TEXT,
+                    tool_name TEXT, token_count INTEGER, created_at INTEGER,
+                    UNIQUE(session_id, ordinal)
+                )"""
             )
+            with self.transaction() as cur:
+                cur.executemany(
+                    self._INSERT_MESSAGE_SQL.format(table="scratch.messages"),
+                    messages,
+                )
+                cur.execute(
+                    """INSERT OR IGNORE INTO main.messages (
+                        session_id, ordinal, role, content_type,
+                        content_text, content_json, tool_name,
+                        token_count, created_at
+                    )
+                    SELECT session_id, ordinal, role, content_type,
+                        content_text, content_json, tool_name,
+                        token_count, created_at
+                    FROM scratch.messages ORDER BY rowid"""
+                )
+        finally:
+            # Only reached once ATTACH succeeded; transaction() has already
+            # committed or rolled back, so DETACH is allowed
+            conn.execute("DETACH DATABASE scratch")
 
     def session_exists(self, session_id: str) -> bool:
         row = self.conn.execute(
@@ -260,6 +425,28 @@ class MemoryDB:
         ).fetchone()
         return dict(row) if row else None
 
+    def get_sessions_bulk(self, session_ids: list[str]) -> dict[str, dict]:
+        """Fetch many sessions in a few IN-queries, keyed by session id."""
+        return self._fetch_by_ids("sessions", "id", session_ids)
+
+    # Keep IN-lists under SQLITE_MAX_VARIABLE_NUMBER (999 on older builds)
+    _IN_CHUNK = 500
+
+    def _fetch_by_ids(
+        self, table: str, key: str, ids: list[str]
+    ) -> dict[str, dict]:
+        result: dict[str, dict] = {}
+        ids = list(dict.fromkeys(ids))
+        for i in range(0, len(ids), self._IN_CHUNK):
+            chunk = ids[i:i + self._IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT * FROM {table} WHERE {key} IN ({placeholders})", chunk
+            ).fetchall()
+            for r in rows:
+                result[r[key]] = dict(r)
+        return result
+
     def get_session_messages(self, session_id: str) -> list[dict]:
         rows = self.conn.execute(
             "SELECT * FROM messages WHERE session_id = ? ORDER BY ordinal",
@@ -267,6 +454,18 @@ class MemoryDB:
         ).fetchall()
         return [dict(r) for r in rows]
 
+    def get_conversation_rows(self, session_id: str) -> list[sqlite3.Row]:
+        """Return (role, content_type, content_text, tool_name) per message.
+
+        Only the columns the summarizer formats, as plain rows, so the
+        content_json payloads are never read or copied into dicts.
+        """
+        return self.conn.execute(
+            """SELECT role, content_type, content_text, tool_name
+            FROM messages WHERE session_id = ? ORDER BY ordinal""",
+            (session_id,),
+        ).fetchall()
+
     def list_sessions(
         self,
         source: str | None = None,
@@ -296,35 +495,62 @@ class MemoryDB:
 
     # ── Entity operations ──
 
-    def upsert_entity(
-        self, entity_type: str, canonical_value: str, seen_at: int
-    ) -> int:
-        cur = self.conn.execute(
-            """INSERT INTO entities (entity_type, canonical_value, first_seen_at, last_seen_at, occurrence_count)
-            VALUES (?, ?, ?, ?, 1)
-            ON CONFLICT(entity_type, canonical_value) DO UPDATE SET
-                last_seen_at = MAX(excluded.last_seen_at, entities.last_seen_at),
-                occurrence_count = entities.occurrence_count + 1
-            RETURNING id""",
-            (entity_type, canonical_value, seen_at, seen_at),
-        )
-        row = cur.fetchone()
-        return row[0]
+    # 5 bound parameters per row; stays under SQLITE_MAX_VARIABLE_NUMBER
+    # (999 on older builds)
+    _ENTITY_UPSERT_CHUNK = 190
 
-    def insert_entity_occurrence(
-        self,
-        entity_id: int,
-        session_id: str,
-        message_id: int,
-        context_snippet: str,
+    def upsert_entities(
+        self, entities: list[tuple[str, str, int, int, int]]
+    ) -> dict[tuple[str, str], int]:
+        """Batch upsert of pre-aggregated entities.
+
+        Each row is (entity_type, canonical_value, first_seen_at,
+        last_seen_at, occurrences).  Returns {(entity_type, value): id}.
+        """
+        ids: dict[tuple[str, str], int] = {}
+        for i in range(0, len(entities), self._ENTITY_UPSERT_CHUNK):
+            chunk = entities[i:i + self._ENTITY_UPSERT_CHUNK]
+            placeholders = ", ".join(["(?, ?, ?, ?, ?)"] * len(chunk))
+            params = [v for row in chunk for v in row]
+            cur = self.conn.execute(
+                f"""INSERT INTO entities (entity_type, canonical_value, first_seen_at, last_seen_at, occurrence_count)
+                VALUES {placeholders}
+                ON CONFLICT(entity_type, canonical_value) DO UPDATE SET
+                    last_seen_at = MAX(excluded.last_seen_at, entities.last_seen_at),
+                    occurrence_count = entities.occurrence_count + excluded.occurrence_count
+                RETURNING id, entity_type, canonical_value""",
+                params,
+            )
+            for row in cur.fetchall():
+                ids[(row[1], row[2])] = row[0]
+        return ids
+
+    def insert_entity_occurrences(
+        self, occurrences: list[tuple[int, str, int, int, int]]
     ) -> None:
-        self.conn.execute(
+        """Batch insert of (entity_id, session_id, message_id, ctx_start, ctx_end)."""
+        self.conn.executemany(
             """INSERT OR IGNORE INTO entity_occurrences
-            (entity_id, session_id, message_id, context_snippet)
-            VALUES (?, ?, ?, ?)""",
-            (entity_id, session_id, message_id, context_snippet),
+            (entity_id, session_id, message_id, ctx_start, ctx_end)
+            VALUES (?, ?, ?, ?, ?)""",
+            occurrences,
         )
 
+    def snippet_for(self, entity_id: int, message_id: int) -> str | None:
+        """Context snippet of an entity occurrence, read from the message text."""
+        row = self.conn.execute(
+            """SELECT COALESCE(
+                substr(m.content_text, o.ctx_start + 1, o.ctx_end - o.ctx_start),
+                o.context_snippet)
+            FROM entity_occurrences o
+            JOIN messages m ON m.id = o.message_id
+            WHERE o.entity_id = ? AND o.message_id = ?""",
+            (entity_id, message_id),
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return row[0].replace("\n", " ").strip()
+
     # ── Summary operations ──
 
     def upsert_summary(self, summary: dict[str, Any]) -> None:
@@ -362,6 +588,10 @@ class MemoryDB:
         ).fetchone()
         return dict(row) if row else None
 
+    def get_summaries_bulk(self, session_ids: list[str]) -> dict[str, dict]:
+        """Fetch summaries for many sessions, keyed by session id."""
+        return self._fetch_by_ids("session_summaries", "session_id", session_ids)
+
     def delete_summary(self, session_id: str) -> bool:
         """Delete summary for re-generation. Reverts tier to L3."""
         with self.transaction() as cur:
@@ -377,21 +607,21 @@ class MemoryDB:
         return deleted > 0
 
     def get_unsummarized_sessions(self, min_user_messages: int = 3) -> list[dict]:
+        # tier is 'L3' exactly when there is no summary (upsert_summary and
+        # delete_summary keep it in sync), so this walks the partial index
+        # idx_sessions_l3_pending in ORDER BY order without joining
+        # summaries; user_message_count is checked per row.
         rows = self.conn.execute(
-            """SELECT s.* FROM sessions s
-            LEFT JOIN session_summaries ss ON s.id = ss.session_id
-            WHERE ss.session_id IS NULL
-            AND s.user_message_count >= ?
-            ORDER BY s.first_message_at DESC""",
+            """SELECT * FROM sessions
+            WHERE tier = 'L3' AND user_message_count >= ?
+            ORDER BY first_message_at DESC""",
             (min_user_messages,),
         ).fetchall()
         return [dict(r) for r in rows]
 
     # ── Project knowledge operations ──
 
-    def upsert_project_knowledge(self, entry: dict[str, Any]) -> int:
-        cur = self.conn.execute(
-            """INSERT INTO project_knowledge (
+    _INSERT_KNOWLEDGE_SQL = """INSERT INTO project_knowledge (
                 project_path, knowledge_type, content, confidence,
                 evidence_count, source_sessions, first_seen_at,
                 last_confirmed_at
@@ -399,12 +629,20 @@ class MemoryDB:
                 :project_path, :knowledge_type, :content, :confidence,
                 :evidence_count, :source_sessions, :first_seen_at,
                 :last_confirmed_at
-            )""",
-            entry,
-        )
+            )"""
+
+    def upsert_project_knowledge(self, entry: dict[str, Any]) -> int:
+        cur = self.conn.execute(self._INSERT_KNOWLEDGE_SQL, entry)
         self.conn.commit()
         return cur.lastrowid  # type: ignore[return-value]
 
+    def upsert_project_knowledge_many(self, entries: list[dict[str, Any]]) -> None:
+        """Insert several knowledge entries in one transaction."""
+        if not entries:
+            return
+        with self.transaction() as cur:
+            cur.executemany(self._INSERT_KNOWLEDGE_SQL, entries)
+
     def clear_project_knowledge(self, project_path: str) -> int:
         """Delete all non-superseded knowledge entries for a project. Returns count deleted."""
         cur = self.conn.execute(
@@ -461,6 +699,10 @@ class MemoryDB:
                 message_count = cur.execute(
                     f"DELETE FROM messages WHERE session_id IN ({placeholders})", sids
                 ).rowcount
+                # Forget the files too, so a later ingest can restore them
+                cur.execute(
+                    f"DELETE FROM parse_cache WHERE session_id IN ({placeholders})", sids
+                )
 
             session_count = cur.execute(
                 "DELETE FROM sessions WHERE project_path = ?", (project_path,)
@@ -482,6 +724,36 @@ class MemoryDB:
         ).fetchall()
         return [dict(r) for r in rows]
 
+    # ── Parse cache ──
+
+    def get_parse_cache(self) -> dict[str, tuple[float, int, str | None, int]]:
+        """Return {raw_path: (mtime, size, session_id, parsed_offset)}."""
+        rows = self.conn.execute(
+            "SELECT raw_path, mtime, size, session_id, parsed_offset FROM parse_cache"
+        ).fetchall()
+        return {r[0]: (r[1], r[2], r[3], r[4] or 0) for r in rows}
+
+    def record_parses(
+        self, entries: list[tuple[str, float, int, str | None, int]]
+    ) -> None:
+        """Store (raw_path, mtime, size, session_id, parsed_offset) entries."""
+        if not entries:
+            return
+        now = int(time.time())
+        with self.transaction() as cur:
+            cur.executemany(
+                """INSERT INTO parse_cache
+                    (raw_path, mtime, size, session_id, parsed_offset, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(raw_path) DO UPDATE SET
+                    mtime = excluded.mtime,
+                    size = excluded.size,
+                    session_id = excluded.session_id,
+                    parsed_offset = excluded.parsed_offset,
+                    ingested_at = excluded.ingested_at""",
+                [(*entry, now) for entry in entries],
+            )
+
     # ── FTS search ──
 
     @staticmethod
@@ -490,26 +762,49 @@ class MemoryDB:
 
         FTS5 interprets characters like - : * ^ and keywords AND/OR/NOT
         as operators.  Wrapping each token in double-quotes forces literal
-        matching (e.g. "2025-12" "o3-mini").
+        matching (e.g. "2025-12" "o3-mini").  Single-character tokens are
+        dropped unless nothing else remains: they match huge doclists while
+        adding almost nothing to relevance.
         """
         tokens = query.split()
         if not tokens:
             return query
+        tokens = [t for t in tokens if len(t) >= 2] or tokens
         return " ".join('"' + t.replace('"', '""') + '"' for t in tokens)
 
-    def search_fts(self, query: str, limit: int = 20) -> list[dict]:
-        """Full-text search across messages."""
+    def search_fts(
+        self,
+        query: str,
+        limit: int = 20,
+        project_path: str | None = None,
+        after: int | None = None,
+    ) -> list[dict]:
+        """Full-text search across messages.
+
+        Optional session filters are applied in the same statement, so
+        ``limit`` counts only rows that pass them.  Each row carries a
+        ``snippet``: up to 32 tokens of context around the match.
+        """
         escaped = self._escape_fts5(query)
+        where = ["messages_fts MATCH ?"]
+        params: list[Any] = [escaped]
+        if project_path:
+            where.append("s.project_path = ?")
+            params.append(project_path)
+        if after:
+            where.append("s.first_message_at >= ?")
+            params.append(after)
+        params.append(limit)
         rows = self.conn.execute(
-            """SELECT m.*, s.source, s.project_name, s.cwd,
-                      bm25(messages_fts) as rank
+            f"""SELECT m.*, s.source, s.project_name, s.cwd, fts.rank,
+                      snippet(messages_fts, 0, '', '', '…', 32) AS snippet
             FROM messages_fts fts
             JOIN messages m ON m.id = fts.rowid
             JOIN sessions s ON s.id = m.session_id
-            WHERE messages_fts MATCH ?
-            ORDER BY rank
+            WHERE {" AND ".join(where)}
+            ORDER BY fts.rank
             LIMIT ?""",
-            (escaped, limit),
+            params,
         ).fetchall()
         return [dict(r) for r in rows]
 
@@ -531,22 +826,25 @@ class MemoryDB:
         return cur.lastrowid  # type: ignore[return-value]
 
     def claim_job(self) -> dict | None:
-        """Claim the next pending job."""
-        row = self.conn.execute(
-            """SELECT * FROM memory_jobs
-            WHERE status = 'pending'
-            ORDER BY priority DESC, created_at ASC
-            LIMIT 1"""
-        ).fetchone()
-        if not row:
-            return None
-        job = dict(row)
-        self.conn.execute(
-            "UPDATE memory_jobs SET status = 'running', started_at = ? WHERE id = ?",
-            (int(time.time()), job["id"]),
-        )
-        self.conn.commit()
-        return job
+        """Claim the next pending job.
+
+        The pick and the status change are one UPDATE ... RETURNING
+        statement, so two workers can never claim the same job.
+        """
+        with self.transaction() as cur:
+            # fetchall steps the statement to completion before the commit
+            rows = cur.execute(
+                """UPDATE memory_jobs SET status = 'running', started_at = ?
+                WHERE id = (
+                    SELECT id FROM memory_jobs
+                    WHERE status = 'pending'
+                    ORDER BY priority DESC, created_at ASC
+                    LIMIT 1
+                )
+                RETURNING *""",
+                (int(time.time()),),
+            ).fetchall()
+        return dict(rows[0]) if rows else None
 
     def finish_job(self, job_id: int, error: str | None = None) -> None:
         if error:
@@ -566,36 +864,31 @@ class MemoryDB:
 
     # ── Stats ──
 
+    _STATS_SQL = """
+        SELECT 'total', 'sessions', COUNT(*) FROM sessions
+        UNION ALL SELECT 'total', 'messages', COUNT(*) FROM messages
+        UNION ALL SELECT 'total', 'entities', COUNT(*) FROM entities
+        UNION ALL SELECT 'total', 'summaries', COUNT(*) FROM session_summaries
+        UNION ALL SELECT 'total', 'knowledge_entries', COUNT(*) FROM project_knowledge
+        UNION ALL SELECT 'source', source, COUNT(*) FROM sessions GROUP BY source
+        UNION ALL SELECT 'tier', tier, COUNT(*) FROM sessions GROUP BY tier
+        UNION ALL SELECT 'jobs', status, COUNT(*) FROM memory_jobs GROUP BY status
+    """
+
     def stats(self) -> dict[str, Any]:
-        """Return database statistics."""
+        """Return database statistics (one statement, labelled rows)."""
         result: dict[str, Any] = {}
-        row = self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
-        result["total_sessions"] = row[0]
-        row = self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()
-        result["total_messages"] = row[0]
-        row = self.conn.execute("SELECT COUNT(*) FROM entities").fetchone()
-        result["total_entities"] = row[0]
-        row = self.conn.execute("SELECT COUNT(*) FROM session_summaries").fetchone()
-        result["total_summaries"] = row[0]
-        row = self.conn.execute("SELECT COUNT(*) FROM project_knowledge").fetchone()
-        result["total_knowledge_entries"] = row[0]
-
-        # Per-source counts
-        rows = self.conn.execute(
-            "SELECT source, COUNT(*) as cnt FROM sessions GROUP BY source"
-        ).fetchall()
-        result["sessions_by_source"] = {r["source"]: r["cnt"] for r in rows}
-
-        # Per-tier counts
-        rows = self.conn.execute(
-            "SELECT tier, COUNT(*) as cnt FROM sessions GROUP BY tier"
-        ).fetchall()
-        result["sessions_by_tier"] = {r["tier"]: r["cnt"] for r in rows}
-
-        # Job queue status
-        rows = self.conn.execute(
-            "SELECT status, COUNT(*) as cnt FROM memory_jobs GROUP BY status"
-        ).fetchall()
-        result["jobs_by_status"] = {r["status"]: r["cnt"] for r in rows}
-
+        groups: dict[str, dict] = {
+            "source": {},
+            "tier": {},
+            "jobs": {},
+        }
+        for kind, key, cnt in self.conn.execute(self._STATS_SQL):
+            if kind == "total":
+                result[f"total_{key}"] = cnt
+            else:
+                groups[kind][key] = cnt
+        result["sessions_by_source"] = groups["source"]
+        result["sessions_by_tier"] = groups["tier"]
+        result["jobs_by_status"] = groups["jobs"]
         return result
@@ -2,9 +2,16 @@
 
 from __future__ import annotations
 
+import multiprocessing
 import re
+import sqlite3
+from collections.abc import Iterable, Mapping
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
 
+from src.config import default_config
 from src.db import MemoryDB
 
 # Entity extraction patterns
@@ -37,68 +44,181 @@ IGNORE_VALUES: dict[str, set[str]] = {
     "package": {"os", "sys", "re", "json", "time", "typing", "io"},
 }
 
+# (entity_type, pattern, ignored values), flattened once for extract_entities
+_SCAN_TABLE: tuple[tuple[str, re.Pattern, frozenset[str]], ...] = tuple(
+    (entity_type, pattern, frozenset(IGNORE_VALUES.get(entity_type, ())))
+    for entity_type, pattern in PATTERNS.items()
+)
+
 
 @dataclass
 class ExtractedEntity:
     entity_type: str
     value: str
-    context: str  # snippet around the match
+    ctx_start: int  # context snippet bounds in the source text
+    ctx_end: int
+
+    def context(self, text: str) -> str:
+        """The snippet around the match, cut from the text it was found in."""
+        return text[self.ctx_start:self.ctx_end].replace("\n", " ").strip()
 
 
 def extract_entities(text: str) -> list[ExtractedEntity]:
     """Extract entities from a text string using regex patterns."""
     results: list[ExtractedEntity] = []
     seen: set[tuple[str, str]] = set()
+    # Hot loop: bind attribute lookups to locals once per call
+    append = results.append
+    seen_add = seen.add
+    text_len = len(text)
 
-    for entity_type, pattern in PATTERNS.items():
-        ignore = IGNORE_VALUES.get(entity_type, set())
+    for entity_type, pattern, ignore in _SCAN_TABLE:
         for match in pattern.finditer(text):
             value = match.group(1).strip()
-            if not value or len(value) < 2:
-                continue
-            if value in ignore:
+            if len(value) < 2 or value in ignore:
                 continue
             key = (entity_type, value)
             if key in seen:
                 continue
-            seen.add(key)
+            seen_add(key)
 
-            # Extract context snippet (50 chars before and after)
-            start = max(0, match.start() - 50)
-            end = min(len(text), match.end() + 50)
-            context = text[start:end].replace("\n", " ").strip()
+            # Context snippet bounds (50 chars before and after)
+            start, end = match.span()
+            start = start - 50 if start > 50 else 0
+            end = end + 50 if end + 50 < text_len else text_len
 
-            results.append(ExtractedEntity(entity_type, value, context))
+            append(ExtractedEntity(entity_type, value, start, end))
 
     return results
 
 
-def extract_entities_for_session(db: MemoryDB, session_id: str) -> int:
-    """Extract entities from all messages in a session and store them."""
-    messages = db.get_session_messages(session_id)
-    session = db.get_session(session_id)
-    if not session:
-        return 0
+# Sessions below this count are scanned in-process; pool start-up costs more
+# than the regex work it would parallelize.
+PARALLEL_SCAN_MIN_SESSIONS = 8
 
-    count = 0
+# Workers are spawned, not forked: this runs inside the threaded MCP server,
+# and forking a process with live threads can deadlock the child.
+_POOL_CONTEXT = multiprocessing.get_context("spawn")
+
+# (entity_type, value, seen_at, message_id, ctx_start, ctx_end)
+EntityRecord = tuple[str, str, int, int, int, int]
+
+
+def _scan_messages(messages: Iterable[Mapping[str, Any]]) -> list[EntityRecord]:
+    """Run extract_entities over user/assistant messages of one session."""
+    records: list[EntityRecord] = []
     for msg in messages:
         if msg["role"] not in ("user", "assistant"):
             continue
-        text = msg.get("content_text", "")
+        text = msg["content_text"]
         if not text:
             continue
+        for ent in extract_entities(text):
+            records.append((
+                ent.entity_type, ent.value, msg["created_at"], msg["id"],
+                ent.ctx_start, ent.ctx_end,
+            ))
+    return records
+
+
+# Just the columns _scan_messages reads; content_json is never loaded
+_SCAN_SQL = """SELECT id, role, content_text, created_at FROM messages
+    WHERE session_id = ? ORDER BY ordinal"""
+
+
+def scan_session(db_path: Path | str, session_id: str) -> list[EntityRecord]:
+    """Extract entity records for a session over a fresh read-only connection.
+
+    Runs in worker processes: WAL mode lets any number of these readers
+    proceed while the parent connection remains the single writer.
+    """
+    # as_uri() percent-escapes '?', '#' and '%' in the path
+    conn = sqlite3.connect(Path(db_path).absolute().as_uri() + "?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(_SCAN_SQL, (session_id,)).fetchall()
+    finally:
+        conn.close()
+    return _scan_messages(rows)
+
+
+def persist_entities(
+    db: MemoryDB, session_id: str, records: list[EntityRecord]
+) -> int:
+    """Store scanned entity records for a session in one transaction.
+
+    Records are aggregated per (entity_type, value) so each entity is
+    upserted once with its occurrence count, in multi-row statements.
+    """
+    if not records:
+        return 0
+    agg: dict[tuple[str, str], list[int]] = {}
+    for entity_type, value, seen_at, *_ in records:
+        entry = agg.get((entity_type, value))
+        if entry is None:
+            agg[(entity_type, value)] = [seen_at, seen_at, 1]
+        else:
+            if seen_at < entry[0]:
+                entry[0] = seen_at
+            if seen_at > entry[1]:
+                entry[1] = seen_at
+            entry[2] += 1
+
+    with db.transaction():
+        ids = db.upsert_entities(
+            [(t, v, first, last, n) for (t, v), (first, last, n) in agg.items()]
+        )
+        db.insert_entity_occurrences([
+            (ids[(entity_type, value)], session_id, message_id, ctx_start, ctx_end)
+            for entity_type, value, _seen_at, message_id, ctx_start, ctx_end in records
+        ])
+    return len(records)
 
-        entities = extract_entities(text)
-        for ent in entities:
-            entity_id = db.upsert_entity(
-                ent.entity_type,
-                ent.value,
-                msg["created_at"],
-            )
-            db.insert_entity_occurrence(
-                entity_id, session_id, msg["id"], ent.context
-            )
-            count += 1
-
-    db.conn.commit()
+
+def extract_entities_for_session(db: MemoryDB, session_id: str) -> int:
+    """Extract entities from all messages in a session and store them."""
+    if not db.session_exists(session_id):
+        return 0
+    records = _scan_messages(db.conn.execute(_SCAN_SQL, (session_id,)))
+    return persist_entities(db, session_id, records)
+
+
+def extract_entities_for_sessions(
+    db: MemoryDB, session_ids: list[str], max_workers: int | None = None
+) -> int:
+    """Extract and store entities for many sessions.
+
+    Regex scanning is fanned out to a process pool (one read-only connection
+    per worker); results are written back serially through ``db``.  Small
+    batches, and sessions whose worker scan fails, are scanned in-process.
+    """
+    if not session_ids:
+        return 0
+    if max_workers is None:
+        max_workers = default_config().max_concurrent_jobs
+    if max_workers <= 1 or len(session_ids) < PARALLEL_SCAN_MIN_SESSIONS:
+        return sum(extract_entities_for_session(db, sid) for sid in session_ids)
+
+    db.conn.commit()  # workers only see committed rows
+    count = 0
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_POOL_CONTEXT) as ex:
+        futures = []
+        try:
+            for sid in session_ids:
+                futures.append(ex.submit(scan_session, db.db_path, sid))
+        except Exception:
+            pass  # workers could not start: the rest are scanned in-process
+        for i, sid in enumerate(session_ids):
+            records = None
+            if i < len(futures):
+                try:
+                    records = futures[i].result()
+                except Exception:
+                    # A dead pool, or the worker's read-only open failing
+                    # (e.g. "database is locked"): retry this session here
+                    records = None
+            if records is None:
+                count += extract_entities_for_session(db, sid)
+            else:
+                count += persist_entities(db, sid, records)
     return count
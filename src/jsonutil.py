@@ -0,0 +1,64 @@
+"""JSON helpers that use orjson when installed, stdlib json otherwise.
+
+orjson is an optional speed-up (``pip install life-long-memory[fast]``) for
+parsing and trace writing.  ``dumps`` always uses stdlib json: its output is
+stored in the database, so it must not depend on which library is installed.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+HAVE_ORJSON = orjson is not None
+
+# orjson.JSONDecodeError subclasses this, so callers can catch one type
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: str | bytes) -> Any:
+    """Parse a JSON document from str or bytes."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson is stricter (e.g. rejects NaN); let stdlib decide
+            pass
+    return json.loads(data)
+
+
+def loads_utf8(data: bytes) -> Any:
+    """Parse a UTF-8 JSON document, decoding invalid bytes as U+FFFD.
+
+    Matches reading the file as text with errors="replace", without the
+    text decode in the common all-valid case.
+    """
+    try:
+        return loads(data)
+    except UnicodeDecodeError:
+        return loads(data.decode("utf-8", errors="replace"))
+
+
+def dumps(obj: Any) -> str:
+    """Serialize to JSON text for storage.
+
+    Same text as ``json.dumps(obj)`` (", "/": " separators, ASCII-escaped),
+    so content_text/content_json, their truncation windows and FTS tokens
+    match rows stored by earlier versions.
+    """
+    return json.dumps(obj)
+
+
+def dumps_pretty(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes indented by two spaces."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode()
@@ -6,16 +6,25 @@ Routes LLM calls to the appropriate backend based on session source.
 
 from __future__ import annotations
 
+import atexit
+import itertools
 import json
 import logging
+import mmap
 import os
 import shutil
 import subprocess
 import tempfile
+import threading
 import time as _time
 import uuid
 from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterable, Iterator
+
+from src import jsonutil, llm_cache
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +35,9 @@ DEFAULT_MODELS = {
     "gemini": "gemini-2.5-flash",
 }
 
+# Backends in preference order for detection and fallback
+_BACKENDS = ("claude", "codex", "gemini")
+
 # Map source names to backend names
 SOURCE_TO_BACKEND = {
     "claude_code": "claude",
@@ -72,22 +84,64 @@ def _save_trace(trace: dict, session_id: str, traces_dir: Path | None = None) ->
     try:
         dest_dir = traces_dir or _default_traces_dir()
         dest = dest_dir / f"{session_id}.json"
-        with open(dest, "w") as f:
-            json.dump(trace, f, indent=2, ensure_ascii=False)
+        dest.write_bytes(jsonutil.dumps_pretty(trace))
         return str(dest)
     except Exception as e:
         logger.warning(f"Failed to save trace: {e}")
         return None
 
 
+class _PromptFiles:
+    """Prompt files handed to the CLIs, in one per-process temp directory.
+
+    Saves NamedTemporaryFile's random-name/O_EXCL dance per call; the
+    directory is created on first use and removed at interpreter exit.
+    """
+
+    def __init__(self) -> None:
+        self._dir: str | None = None
+        self._pid = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def write(self, prompt: str) -> Path:
+        """Write a prompt to a fresh file and return its path (caller unlinks)."""
+        if self._pid != os.getpid():  # first use, or a forked child
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._dir = tempfile.mkdtemp(prefix="llm-prompts-")
+                    self._pid = os.getpid()
+                    atexit.register(self._cleanup, self._dir, self._pid)
+        path = Path(self._dir) / f"prompt_{next(self._counter)}.txt"
+        path.write_text(prompt)
+        return path
+
+    @staticmethod
+    def _cleanup(directory: str, pid: int) -> None:
+        if os.getpid() == pid:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+_prompt_files = _PromptFiles()
+
+
 # ---------------------------------------------------------------------------
 # Backend detection & dispatch
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=8)
+def _which(cmd: str) -> str | None:
+    """Memoized shutil.which; PATH lookups stat every directory.
+
+    Call ``_which.cache_clear()`` after installing a CLI at runtime.
+    """
+    return shutil.which(cmd)
+
+
 def _detect_available_backend() -> str | None:
     """Detect which CLI backends are available on PATH."""
-    for backend, cmd in [("claude", "claude"), ("codex", "codex"), ("gemini", "gemini")]:
-        if shutil.which(cmd):
+    for backend in _BACKENDS:  # each backend's CLI is named after it
+        if _which(backend):
             return backend
     return None
 
@@ -96,7 +150,7 @@ def _resolve_backend(source: str | None) -> str:
     """Map a session source to a backend, falling back to any available CLI."""
     if source:
         backend = SOURCE_TO_BACKEND.get(source)
-        if backend and shutil.which(backend if backend != "claude" else "claude"):
+        if backend and _which(backend):
             return backend
     fallback = _detect_available_backend()
     if fallback:
@@ -113,29 +167,45 @@ def call_llm(
     model: str | None = None,
     backend: str | None = None,
 ) -> str:
-    """Dispatch an LLM call to the appropriate backend. Returns text."""
+    """Dispatch an LLM call to the appropriate backend. Returns text.
+
+    With ``LLM_CACHE=1`` responses are cached on disk (see llm_cache) and a
+    repeated (backend, model, prompt) is answered without running the CLI.
+    """
     if backend:
         resolved = backend
     else:
         resolved = _resolve_backend(source)
     effective_model = model or DEFAULT_MODELS[resolved]
 
+    key = None
+    if llm_cache.enabled():
+        key = llm_cache.cache_key(resolved, effective_model, prompt)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+
+    # Built per call so the functions are looked up at call time
     dispatch = {"claude": call_claude, "codex": call_codex, "gemini": call_gemini}
     try:
-        return dispatch[resolved](prompt, model=effective_model)
+        text = dispatch[resolved](prompt, model=effective_model)
     except Exception:
         if backend:
             raise
-        for fb_name in ["claude", "codex", "gemini"]:
+        for fb_name in _BACKENDS:
             if fb_name == resolved:
                 continue
-            if not shutil.which(fb_name):
+            if not _which(fb_name):
                 continue
             try:
+                # Fallback answers are not cached: the key names the primary
                 return dispatch[fb_name](prompt, model=model or DEFAULT_MODELS[fb_name])
             except Exception:
                 continue
         raise
+    if key is not None:
+        llm_cache.put(key, text)
+    return text
 
 
 def call_llm_full(
@@ -145,11 +215,12 @@ def call_llm_full(
     model: str | None = None,
     backend: str | None = None,
     traces_dir: Path | None = None,
+    lite: bool = False,
 ) -> LLMResponse:
     """Dispatch a full LLM call with structured response + trace.
 
     Like call_llm() but returns an LLMResponse with thinking, tool calls,
-    usage, and saves a clean trace file.
+    usage, and saves a clean trace file.  ``lite`` leaves raw_messages empty.
     """
     if backend:
         resolved = backend
@@ -162,7 +233,9 @@ def call_llm_full(
         "codex": call_codex_full,
         "gemini": call_gemini_full,
     }
-    return dispatch[resolved](prompt, model=effective_model, traces_dir=traces_dir)
+    return dispatch[resolved](
+        prompt, model=effective_model, traces_dir=traces_dir, lite=lite
+    )
 
 
 # ===========================================================================
@@ -174,6 +247,13 @@ def _cwd_to_slug(cwd: str) -> str:
     return cwd.replace("/", "-").replace("\\", "-")
 
 
+# (projects_base, session_id) -> transcript path, and the project directory
+# of the most recent hit
+_SESSION_PATH_CACHE_SIZE = 256
+_session_path_cache: dict[tuple[str, str], str] = {}
+_last_project_dir: str | None = None
+
+
 def _find_session_jsonl(session_id: str, projects_base: Path | None = None) -> Path | None:
     """Locate the JSONL session file for a given Claude session ID."""
     if projects_base is None:
@@ -181,199 +261,323 @@ def _find_session_jsonl(session_id: str, projects_base: Path | None = None) -> P
     projects_base = projects_base.expanduser()
     if not projects_base.exists():
         return None
+    global _last_project_dir
+    base = str(projects_base)
     target = f"{session_id}.jsonl"
-    for project_dir in projects_base.iterdir():
-        if not project_dir.is_dir():
-            continue
-        candidate = project_dir / target
-        if candidate.exists():
-            return candidate
-    return None
 
+    cached = _session_path_cache.get((base, session_id))
+    if cached is not None and os.path.exists(cached):
+        return Path(cached)
+    # Consecutive calls usually run in the same project, so its directory
+    # is checked before scanning them all
+    candidate = None
+    last = _last_project_dir
+    if last is not None and os.path.dirname(last) == base:
+        candidate = os.path.join(last, target)
+        if not os.path.exists(candidate):
+            candidate = None
+    if candidate is None:
+        with os.scandir(projects_base) as entries:
+            for project_dir in entries:
+                if not project_dir.is_dir():
+                    continue
+                path = os.path.join(project_dir.path, target)
+                if os.path.exists(path):
+                    candidate = path
+                    break
+    if candidate is None:
+        return None
 
-def _parse_session_jsonl(jsonl_path: Path, session_id: str) -> LLMResponse:
-    """Parse a Claude Code JSONL session file into an LLMResponse."""
-    response = LLMResponse(session_id=session_id, backend="claude")
-    text_parts: list[str] = []
+    _last_project_dir = os.path.dirname(candidate)
+    if len(_session_path_cache) >= _SESSION_PATH_CACHE_SIZE:
+        # FIFO eviction: dicts iterate in insertion order
+        _session_path_cache.pop(next(iter(_session_path_cache), None), None)
+    _session_path_cache[(base, session_id)] = candidate
+    return Path(candidate)
 
-    with open(jsonl_path, "r", errors="replace") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
+
+# Transcript records come straight from jsonutil.loads, so their containers
+# are exactly dict and list; the readers below test ``type(x) is dict``
+# rather than isinstance().
+def _read_jsonl(path: Path) -> Iterator[dict]:
+    """Yield the records of a JSONL transcript, skipping malformed lines.
+
+    The file is memory-mapped and split on newlines as bytes, so lines are
+    neither copied through a text buffer nor decoded twice.  Invalid UTF-8 is
+    decoded with replacement characters.
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file: nothing to map
+            return
+    with mm:
+        size = len(mm)
+        start = 0
+        while start < size:
+            end = mm.find(b"\n", start)
+            if end == -1:
+                end = size
+            line = mm[start:end].strip()
+            start = end + 1
+            if line[:1] not in (b"{", b"["):
+                continue  # blank, or cannot be a JSON record
             try:
-                rec = json.loads(line)
-            except json.JSONDecodeError:
+                rec = jsonutil.loads_utf8(line)
+            except jsonutil.JSONDecodeError:
                 continue
+            yield rec
 
-            message = rec.get("message", {})
-            if not message:
-                continue
-            response.raw_messages.append(rec)
 
-            usage = message.get("usage", {})
-            if usage:
-                response.usage = usage
+def _parse_session_jsonl(
+    jsonl_path: Path,
+    session_id: str,
+    records: Iterable[dict] | None = None,
+    lite: bool = False,
+) -> LLMResponse:
+    """Parse a Claude Code JSONL session file into an LLMResponse.
+
+    Pass already-decoded ``records`` to avoid reading the file again.  With
+    ``lite``, raw_messages is left empty so the records can be freed.
+    """
+    response = LLMResponse(session_id=session_id, backend="claude")
+    text_parts: list[str] = []
+    keep_raw = None if lite else response.raw_messages.append
 
-            role = message.get("role", "")
-            content = message.get("content", "")
+    if records is None:
+        records = _read_jsonl(jsonl_path)
+    for rec in records:
+        message = rec.get("message", {})
+        if not message:
+            continue
+        mg = message.get
+        if keep_raw is not None:
+            keep_raw(rec)
+
+        usage = mg("usage", {})
+        if usage:
+            response.usage = usage
+
+        role = mg("role", "")
+        content = mg("content", "")
+
+        if role == "assistant" and type(content) is list:
+            for block in content:
+                if type(block) is not dict:
+                    continue
+                bg = block.get
+                btype = bg("type", "")
+                if btype == "thinking":
+                    t = bg("thinking", "")
+                    if t.strip():
+                        response.thinking.append(t)
+                elif btype == "text":
+                    t = bg("text", "")
+                    if t.strip():
+                        text_parts.append(t)
+                elif btype == "tool_use":
+                    response.tool_calls.append({
+                        "id": bg("id", ""),
+                        "name": bg("name", ""),
+                        "input": bg("input", {}),
+                    })
 
-            if role == "assistant" and isinstance(content, list):
-                for block in content:
-                    if not isinstance(block, dict):
-                        continue
-                    btype = block.get("type", "")
-                    if btype == "thinking":
-                        t = block.get("thinking", "")
-                        if t.strip():
-                            response.thinking.append(t)
-                    elif btype == "text":
-                        t = block.get("text", "")
-                        if t.strip():
-                            text_parts.append(t)
-                    elif btype == "tool_use":
-                        response.tool_calls.append({
-                            "id": block.get("id", ""),
-                            "name": block.get("name", ""),
-                            "input": block.get("input", {}),
-                        })
-
-            elif role == "user" and isinstance(content, list):
-                for block in content:
-                    if not isinstance(block, dict):
-                        continue
-                    if block.get("type") == "tool_result":
-                        rc = block.get("content", "")
-                        if isinstance(rc, list):
-                            rc = "\n".join(
-                                rb.get("text", "") for rb in rc
-                                if isinstance(rb, dict) and rb.get("type") == "text"
-                            )
-                        response.tool_results.append({
-                            "tool_use_id": block.get("tool_use_id", ""),
-                            "content": rc,
-                            "is_error": block.get("is_error", False),
-                        })
+        elif role == "user" and type(content) is list:
+            for block in content:
+                if type(block) is not dict:
+                    continue
+                bg = block.get
+                if bg("type") == "tool_result":
+                    rc = bg("content", "")
+                    if type(rc) is list:
+                        rc = "\n".join(
+                            rb.get("text", "") for rb in rc
+                            if type(rb) is dict and rb.get("type") == "text"
+                        )
+                    response.tool_results.append({
+                        "tool_use_id": bg("tool_use_id", ""),
+                        "content": rc,
+                        "is_error": bg("is_error", False),
+                    })
 
     response.text = "\n".join(text_parts)
     return response
 
 
-def _build_claude_trace(jsonl_path: Path, session_id: str) -> dict:
-    """Build a clean trace from a raw Claude JSONL session file."""
+def _trace_assistant_thinking(block: dict, ts: str, turns: list[dict]) -> None:
+    if block.get("thinking", "").strip():
+        turns.append({"role": "assistant", "type": "thinking", "text": block["thinking"], "ts": ts})
+
+
+def _trace_assistant_text(block: dict, ts: str, turns: list[dict]) -> None:
+    if block.get("text", "").strip():
+        turns.append({"role": "assistant", "type": "text", "text": block["text"], "ts": ts})
+
+
+def _trace_assistant_tool_use(block: dict, ts: str, turns: list[dict]) -> None:
+    bg = block.get
+    turns.append({"role": "assistant", "type": "tool_use", "tool": bg("name", ""),
+                  "input": bg("input", {}), "id": bg("id", ""), "ts": ts})
+
+
+def _trace_user_text(block: dict, ts: str, turns: list[dict]) -> None:
+    if block.get("text", "").strip():
+        turns.append({"role": "user", "type": "text", "text": block["text"], "ts": ts})
+
+
+def _trace_user_tool_result(block: dict, ts: str, turns: list[dict]) -> None:
+    bg = block.get
+    rc = bg("content", "")
+    if type(rc) is list:
+        rc = "\n".join(rb.get("text", "") for rb in rc if type(rb) is dict and rb.get("type") == "text")
+    turns.append({"role": "tool", "type": "tool_result", "tool_use_id": bg("tool_use_id", ""),
+                  "content": str(rc), "is_error": bg("is_error", False), "ts": ts})
+
+
+# Content block type -> trace handler(block, ts, turns); other types are skipped
+_ASSISTANT_TRACE_HANDLERS = {
+    "thinking": _trace_assistant_thinking,
+    "text": _trace_assistant_text,
+    "tool_use": _trace_assistant_tool_use,
+}
+_USER_TRACE_HANDLERS = {
+    "text": _trace_user_text,
+    "tool_result": _trace_user_tool_result,
+}
+
+
+def _trace_blocks(content: list, ts: str, turns: list[dict], handlers: dict) -> None:
+    """Append trace turns for a message's content blocks via ``handlers``."""
+    get_handler = handlers.get
+    for block in content:
+        if type(block) is not dict:
+            continue
+        bt = block.get("type", "")
+        handler = get_handler(bt) if type(bt) is str else None
+        if handler is not None:
+            handler(block, ts, turns)
+
+
+def _build_claude_trace(
+    jsonl_path: Path, session_id: str, records: Iterable[dict] | None = None
+) -> dict:
+    """Build a clean trace from a raw Claude JSONL session file (or its ``records``)."""
     meta: dict = {}
     turns: list[dict] = []
     final_usage: dict = {}
 
-    with open(jsonl_path, "r", errors="replace") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rec = json.loads(line)
-            except json.JSONDecodeError:
-                continue
+    if records is None:
+        records = _read_jsonl(jsonl_path)
+    for rec in records:
+        rg = rec.get
+        if rg("type") in ("queue-operation", "progress", "file-history-snapshot"):
+            continue
 
-            if rec.get("type") in ("queue-operation", "progress", "file-history-snapshot"):
-                continue
+        if not meta:
+            meta = {k: rec[k] for k in ("sessionId", "cwd", "gitBranch", "version") if k in rec}
+            if "model" in rg("message", {}):
+                meta["model"] = rec["message"]["model"]
 
-            if not meta:
-                meta = {k: rec[k] for k in ("sessionId", "cwd", "gitBranch", "version") if k in rec}
-                if "model" in rec.get("message", {}):
-                    meta["model"] = rec["message"]["model"]
+        message = rg("message", {})
+        if not message:
+            continue
+        mg = message.get
 
-            message = rec.get("message", {})
-            if not message:
-                continue
+        role = mg("role", "")
+        content = mg("content", "")
+        ts = rg("timestamp", "")
 
-            role = message.get("role", "")
-            content = message.get("content", "")
-            ts = rec.get("timestamp", "")
+        if mg("usage"):
+            final_usage = message["usage"]
 
-            if message.get("usage"):
-                final_usage = message["usage"]
+        if role == "assistant" and type(content) is list:
+            if "model" in message and message["model"]:
+                meta["model"] = message["model"]
+            _trace_blocks(content, ts, turns, _ASSISTANT_TRACE_HANDLERS)
 
-            if role == "assistant" and isinstance(content, list):
-                if "model" in message and message["model"]:
-                    meta["model"] = message["model"]
-                for block in content:
-                    if not isinstance(block, dict):
-                        continue
-                    bt = block.get("type", "")
-                    if bt == "thinking" and block.get("thinking", "").strip():
-                        turns.append({"role": "assistant", "type": "thinking", "text": block["thinking"], "ts": ts})
-                    elif bt == "text" and block.get("text", "").strip():
-                        turns.append({"role": "assistant", "type": "text", "text": block["text"], "ts": ts})
-                    elif bt == "tool_use":
-                        turns.append({"role": "assistant", "type": "tool_use", "tool": block.get("name", ""),
-                                      "input": block.get("input", {}), "id": block.get("id", ""), "ts": ts})
-
-            elif role == "user":
-                if isinstance(content, str) and content.strip():
-                    turns.append({"role": "user", "type": "text", "text": content, "ts": ts})
-                elif isinstance(content, list):
-                    for block in content:
-                        if not isinstance(block, dict):
-                            continue
-                        bt = block.get("type", "")
-                        if bt == "text" and block.get("text", "").strip():
-                            turns.append({"role": "user", "type": "text", "text": block["text"], "ts": ts})
-                        elif bt == "tool_result":
-                            rc = block.get("content", "")
-                            if isinstance(rc, list):
-                                rc = "\n".join(rb.get("text", "") for rb in rc if isinstance(rb, dict) and rb.get("type") == "text")
-                            turns.append({"role": "tool", "type": "tool_result", "tool_use_id": block.get("tool_use_id", ""),
-                                          "content": str(rc), "is_error": block.get("is_error", False), "ts": ts})
+        elif role == "user":
+            if isinstance(content, str) and content.strip():
+                turns.append({"role": "user", "type": "text", "text": content, "ts": ts})
+            elif type(content) is list:
+                _trace_blocks(content, ts, turns, _USER_TRACE_HANDLERS)
 
     return {"session_id": session_id, "backend": "claude", **meta, "usage": final_usage, "turns": turns}
 
 
+@dataclass(slots=True)
+class _StreamState:
+    """Text collected from a claude --output-format stream-json run."""
+
+    result_text: str | None = None
+    assistant_texts: list[str] = field(default_factory=list)
+
+
+def _on_result_event(event: dict, state: _StreamState) -> None:
+    state.result_text = event.get("result", "")
+
+
+def _on_assistant_event(event: dict, state: _StreamState) -> None:
+    for block in event.get("message", {}).get("content", []):
+        if block.get("type") == "text":
+            state.assistant_texts.append(block["text"])
+
+
+# Stream-json event type -> handler; other event types are ignored
+_CLAUDE_STREAM_HANDLERS = {
+    "result": _on_result_event,
+    "assistant": _on_assistant_event,
+}
+
+
 def _run_claude_cli(prompt: str, *, model: str = "haiku", session_id: str | None = None) -> tuple[str, str]:
     """Run the claude CLI and return (text_result, session_id)."""
     if session_id is None:
         session_id = str(uuid.uuid4())
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write(prompt)
-        prompt_file = f.name
+    prompt_file = _prompt_files.write(prompt)
     try:
         cmd = [
             "claude", "--print", "--model", model, "--session-id", session_id,
             "--output-format", "stream-json", "--verbose", "--dangerously-skip-permissions",
             f"Read the file {prompt_file} and follow the instructions in it exactly. Return ONLY the requested output format, nothing else.",
         ]
-        env = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
-
-        result_text = None
-        assistant_texts = []
+        env = os.environ.copy()
+        env.pop("CLAUDECODE", None)
+        # stdout stays binary: events are handed to the JSON parser as bytes
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        # Drain stderr concurrently: a CLI that fills the stderr pipe while
+        # we block on stdout would otherwise deadlock
+        stderr_parts: list[bytes] = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_parts.append(proc.stderr.read()), daemon=True
+        )
+        stderr_reader.start()
+
+        state = _StreamState()
+        get_handler = _CLAUDE_STREAM_HANDLERS.get
         for line in proc.stdout:
             line = line.strip()
-            if not line:
-                continue
+            if line[:1] not in (b"{", b"["):
+                continue  # blank line or CLI chatter
             try:
-                event = json.loads(line)
-            except json.JSONDecodeError:
+                event = jsonutil.loads_utf8(line)
+            except jsonutil.JSONDecodeError:
                 continue
             etype = event.get("type")
-            if etype == "result":
-                result_text = event.get("result", "")
-            elif etype == "assistant":
-                msg = event.get("message", {})
-                for block in msg.get("content", []):
-                    if block.get("type") == "text":
-                        assistant_texts.append(block["text"])
+            handler = get_handler(etype) if isinstance(etype, str) else None
+            if handler is not None:
+                handler(event, state)
         proc.wait()
+        stderr_reader.join()
 
-        if result_text:
-            return result_text, session_id
-        if assistant_texts:
-            return "\n".join(assistant_texts), session_id
-        stderr = proc.stderr.read()
+        if state.result_text:
+            return state.result_text, session_id
+        if state.assistant_texts:
+            return "\n".join(state.assistant_texts), session_id
+        stderr = b"".join(stderr_parts).decode(errors="replace")
         raise RuntimeError(f"claude CLI returned no output (exit={proc.returncode}): {stderr[:500]}")
     finally:
-        Path(prompt_file).unlink(missing_ok=True)
+        prompt_file.unlink(missing_ok=True)
 
 
 def call_claude(prompt: str, *, model: str = "haiku", max_tokens: int = 4000) -> str:
@@ -385,17 +589,23 @@ def call_claude(prompt: str, *, model: str = "haiku", max_tokens: int = 4000) ->
 def call_claude_full(
     prompt: str, *, model: str = "haiku", session_id: str | None = None,
     projects_base: Path | None = None, traces_dir: Path | None = None,
+    lite: bool = False,
 ) -> LLMResponse:
-    """Call Claude via CLI and return structured response with thinking/tool_use + trace."""
+    """Call Claude via CLI and return structured response with thinking/tool_use + trace.
+
+    ``lite`` skips collecting raw_messages for callers that do not read them.
+    """
     sid = session_id or str(uuid.uuid4())
     text, sid = _run_claude_cli(prompt, model=model, session_id=sid)
 
     jsonl_path = _find_session_jsonl(sid, projects_base)
     if jsonl_path:
-        response = _parse_session_jsonl(jsonl_path, sid)
+        # Decode the transcript once for both the response and the trace
+        records = list(_read_jsonl(jsonl_path))
+        response = _parse_session_jsonl(jsonl_path, sid, records, lite=lite)
         if not response.text:
             response.text = text
-        trace = _build_claude_trace(jsonl_path, sid)
+        trace = _build_claude_trace(jsonl_path, sid, records)
         response.jsonl_path = _save_trace(trace, sid, traces_dir)
         return response
 
@@ -406,185 +616,218 @@ def call_claude_full(
 # Codex backend
 # ===========================================================================
 
+def _walk_files(base: str, pattern: str) -> Iterator[tuple[str, float]]:
+    """Yield (path, mtime) for files under base whose name matches pattern.
+
+    Recursive os.scandir walk: entries come with their file type, and no
+    Path object is built per entry.  Like Path.rglob, symlinked directories
+    are not followed and unreadable directories are skipped.
+    """
+    try:
+        with os.scandir(base) as it:
+            entries = list(it)
+    except OSError:
+        return
+    subdirs = []
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif fnmatchcase(entry.name, pattern):
+                yield entry.path, entry.stat().st_mtime
+        except OSError:
+            continue  # removed while scanning
+    for subdir in subdirs:
+        yield from _walk_files(subdir, pattern)
+
+
+def _newest_file(base: Path, pattern: str, after_ts: float) -> Path | None:
+    """Newest file under base matching pattern, if modified at/after after_ts."""
+    best: str | None = None
+    best_mtime = after_ts
+    for path, mtime in _walk_files(str(base), pattern):
+        if mtime > best_mtime or (best is None and mtime == best_mtime):
+            best, best_mtime = path, mtime
+    return Path(best) if best is not None else None
+
+
 def _find_latest_codex_session(after_ts: float) -> Path | None:
     """Find the most recently created Codex session JSONL created after after_ts."""
     base = Path.home() / ".codex" / "sessions"
     if not base.exists():
         return None
-    candidates = sorted(base.rglob("rollout-*.jsonl"), key=lambda p: p.stat().st_mtime, reverse=True)
-    for c in candidates:
-        if c.stat().st_mtime >= after_ts:
-            return c
-    return None
+    return _newest_file(base, "rollout-*.jsonl", after_ts)
+
 
+def _parse_codex_session(
+    jsonl_path: Path, records: Iterable[dict] | None = None, lite: bool = False
+) -> LLMResponse:
+    """Parse a Codex session JSONL (or its decoded ``records``) into an LLMResponse.
 
-def _parse_codex_session(jsonl_path: Path) -> LLMResponse:
-    """Parse a Codex session JSONL into an LLMResponse."""
+    With ``lite``, raw_messages is left empty.
+    """
     response = LLMResponse(backend="codex")
     text_parts: list[str] = []
-
-    with open(jsonl_path, "r", errors="replace") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rec = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            response.raw_messages.append(rec)
-            rec_type = rec.get("type", "")
-            payload = rec.get("payload", {})
-
-            if rec_type == "session_meta":
-                response.session_id = payload.get("id", "")
-
-            elif rec_type == "event_msg":
-                pt = payload.get("type", "")
-                if pt == "token_count":
-                    info = payload.get("info")
-                    if info and isinstance(info, dict):
-                        response.usage = info.get("total_token_usage", {})
-
-            elif rec_type == "response_item":
-                pt = payload.get("type", "")
-
-                if pt == "reasoning":
-                    parts = []
-                    for s in payload.get("summary", []):
-                        if isinstance(s, dict):
-                            parts.append(s.get("text", ""))
-                    text = "\n".join(parts)
-                    if text.strip():
-                        response.thinking.append(text)
-
-                elif pt in ("function_call", "custom_tool_call"):
-                    name = payload.get("name", "")
-                    args = payload.get("arguments", payload.get("input", ""))
-                    response.tool_calls.append({
-                        "name": name, "arguments": args,
-                        "call_id": payload.get("call_id", ""),
-                    })
-
-                elif pt in ("function_call_output", "custom_tool_call_output"):
-                    response.tool_results.append({
-                        "call_id": payload.get("call_id", ""),
-                        "content": payload.get("output", ""),
-                    })
-
-                elif pt == "message":
-                    role = payload.get("role", "")
-                    if role == "assistant":
-                        for part in payload.get("content", []):
-                            if isinstance(part, dict):
-                                t = part.get("text", "")
-                                if t:
-                                    text_parts.append(t)
-                            elif isinstance(part, str):
-                                text_parts.append(part)
+    keep_raw = None if lite else response.raw_messages.append
+
+    if records is None:
+        records = _read_jsonl(jsonl_path)
+    for rec in records:
+        if keep_raw is not None:
+            keep_raw(rec)
+        rg = rec.get
+        rec_type = rg("type", "")
+        payload = rg("payload", {})
+
+        if rec_type == "session_meta":
+            response.session_id = payload.get("id", "")
+
+        elif rec_type == "event_msg":
+            pg = payload.get
+            pt = pg("type", "")
+            if pt == "token_count":
+                info = pg("info")
+                if info and type(info) is dict:
+                    response.usage = info.get("total_token_usage", {})
+
+        elif rec_type == "response_item":
+            pg = payload.get
+            pt = pg("type", "")
+
+            if pt == "reasoning":
+                parts = []
+                for s in pg("summary", []):
+                    if type(s) is dict:
+                        parts.append(s.get("text", ""))
+                text = "\n".join(parts)
+                if text.strip():
+                    response.thinking.append(text)
+
+            elif pt in ("function_call", "custom_tool_call"):
+                name = pg("name", "")
+                args = pg("arguments", pg("input", ""))
+                response.tool_calls.append({
+                    "name": name, "arguments": args,
+                    "call_id": pg("call_id", ""),
+                })
+
+            elif pt in ("function_call_output", "custom_tool_call_output"):
+                response.tool_results.append({
+                    "call_id": pg("call_id", ""),
+                    "content": pg("output", ""),
+                })
+
+            elif pt == "message":
+                role = pg("role", "")
+                if role == "assistant":
+                    for part in pg("content", []):
+                        if type(part) is dict:
+                            t = part.get("text", "")
+                            if t:
+                                text_parts.append(t)
+                        elif isinstance(part, str):
+                            text_parts.append(part)
 
     response.text = "\n".join(text_parts)
     return response
 
 
-def _build_codex_trace(jsonl_path: Path) -> dict:
-    """Build a clean trace from a Codex session JSONL."""
+# Injected instruction/context blocks left out of Codex traces
+_CODEX_TRACE_SKIP_PREFIXES = (
+    "<environment_context>", "<permissions", "# AGENTS.md", "<INSTRUCTIONS>",
+)
+
+
+def _build_codex_trace(jsonl_path: Path, records: Iterable[dict] | None = None) -> dict:
+    """Build a clean trace from a Codex session JSONL (or its decoded ``records``)."""
     meta: dict = {}
     turns: list[dict] = []
     usage: dict = {}
 
-    with open(jsonl_path, "r", errors="replace") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rec = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            rec_type = rec.get("type", "")
-            payload = rec.get("payload", {})
-            ts = rec.get("timestamp", "")
-
-            if rec_type == "session_meta":
-                meta = {
-                    "session_id": payload.get("id", ""),
-                    "cwd": payload.get("cwd", ""),
-                    "version": payload.get("cli_version", ""),
-                }
-
-            elif rec_type == "turn_context":
-                if not meta.get("model"):
-                    meta["model"] = payload.get("model", "")
-
-            elif rec_type == "event_msg":
-                pt = payload.get("type", "")
-                if pt == "token_count":
-                    info = payload.get("info")
-                    if info and isinstance(info, dict):
-                        usage = info.get("total_token_usage", {})
-                elif pt == "user_message":
-                    text = payload.get("message", "")
+    if records is None:
+        records = _read_jsonl(jsonl_path)
+    for rec in records:
+        rg = rec.get
+        rec_type = rg("type", "")
+        payload = rg("payload", {})
+        ts = rg("timestamp", "")
+
+        if rec_type == "session_meta":
+            pg = payload.get
+            meta = {
+                "session_id": pg("id", ""),
+                "cwd": pg("cwd", ""),
+                "version": pg("cli_version", ""),
+            }
+
+        elif rec_type == "turn_context":
+            if not meta.get("model"):
+                meta["model"] = payload.get("model", "")
+
+        elif rec_type == "event_msg":
+            pg = payload.get
+            pt = pg("type", "")
+            if pt == "token_count":
+                info = pg("info")
+                if info and type(info) is dict:
+                    usage = info.get("total_token_usage", {})
+            elif pt == "user_message":
+                text = pg("message", "")
+                if text.strip():
+                    turns.append({"role": "user", "type": "text", "text": text, "ts": ts})
+
+        elif rec_type == "response_item":
+            pg = payload.get
+            pt = pg("type", "")
+
+            if pt == "reasoning":
+                parts = []
+                for s in pg("summary", []):
+                    if type(s) is dict:
+                        parts.append(s.get("text", ""))
+                text = "\n".join(parts)
+                if text.strip():
+                    turns.append({"role": "assistant", "type": "thinking", "text": text, "ts": ts})
+
+            elif pt in ("function_call", "custom_tool_call"):
+                name = pg("name", "")
+                args = pg("arguments", pg("input", ""))
+                turns.append({
+                    "role": "assistant", "type": "tool_use", "tool": name,
+                    "input": args, "id": pg("call_id", ""), "ts": ts,
+                })
+
+            elif pt in ("function_call_output", "custom_tool_call_output"):
+                turns.append({
+                    "role": "tool", "type": "tool_result",
+                    "call_id": pg("call_id", ""),
+                    "content": pg("output", ""), "ts": ts,
+                })
+
+            elif pt == "message":
+                role = pg("role", "")
+                # Skip system/developer/context messages
+                if role in ("developer", "system"):
+                    continue
+                content_parts = pg("content", [])
+                for part in content_parts:
+                    text = ""
+                    if type(part) is dict:
+                        text = part.get("text", "")
+                    elif isinstance(part, str):
+                        text = part
                     if text.strip():
-                        turns.append({"role": "user", "type": "text", "text": text, "ts": ts})
-
-            elif rec_type == "response_item":
-                pt = payload.get("type", "")
-
-                if pt == "reasoning":
-                    parts = []
-                    for s in payload.get("summary", []):
-                        if isinstance(s, dict):
-                            parts.append(s.get("text", ""))
-                    text = "\n".join(parts)
-                    if text.strip():
-                        turns.append({"role": "assistant", "type": "thinking", "text": text, "ts": ts})
-
-                elif pt in ("function_call", "custom_tool_call"):
-                    name = payload.get("name", "")
-                    args = payload.get("arguments", payload.get("input", ""))
-                    turns.append({
-                        "role": "assistant", "type": "tool_use", "tool": name,
-                        "input": args, "id": payload.get("call_id", ""), "ts": ts,
-                    })
-
-                elif pt in ("function_call_output", "custom_tool_call_output"):
-                    turns.append({
-                        "role": "tool", "type": "tool_result",
-                        "call_id": payload.get("call_id", ""),
-                        "content": payload.get("output", ""), "ts": ts,
-                    })
-
-                elif pt == "message":
-                    role = payload.get("role", "")
-                    # Skip system/developer/context messages
-                    if role in ("developer", "system"):
-                        continue
-                    content_parts = payload.get("content", [])
-                    for part in content_parts:
-                        text = ""
-                        if isinstance(part, dict):
-                            text = part.get("text", "")
-                        elif isinstance(part, str):
-                            text = part
-                        if text.strip():
-                            # Skip large instruction/context blocks
-                            if text.startswith("<environment_context>") or text.startswith("<permissions"):
-                                continue
-                            if text.startswith("# AGENTS.md") or text.startswith("<INSTRUCTIONS>"):
-                                continue
-                            turns.append({"role": role, "type": "text", "text": text, "ts": ts})
+                        # Skip large instruction/context blocks
+                        if text.startswith(_CODEX_TRACE_SKIP_PREFIXES):
+                            continue
+                        turns.append({"role": role, "type": "text", "text": text, "ts": ts})
 
     return {"backend": "codex", **meta, "usage": usage, "turns": turns}
 
 
 def call_codex(prompt: str, *, model: str = "o3") -> str:
     """Call Codex CLI. Returns text."""
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write(prompt)
-        prompt_file = f.name
+    prompt_file = _prompt_files.write(prompt)
     try:
         cmd = [
             "codex", "exec", "--skip-git-repo-check", "--json", "--full-auto", "-m", model,
@@ -598,7 +841,7 @@ def call_codex(prompt: str, *, model: str = "o3") -> str:
             raise RuntimeError(f"codex CLI returned no output (exit={proc.returncode}): {proc.stderr[:500]}")
         return _parse_codex_json(output)
     finally:
-        Path(prompt_file).unlink(missing_ok=True)
+        prompt_file.unlink(missing_ok=True)
 
 
 def _parse_codex_json(output: str) -> str:
@@ -606,11 +849,11 @@ def _parse_codex_json(output: str) -> str:
     assistant_texts = []
     for line in output.splitlines():
         line = line.strip()
-        if not line:
-            continue
+        if line[:1] not in ("{", "["):
+            continue  # blank line or CLI chatter
         try:
-            event = json.loads(line)
-        except json.JSONDecodeError:
+            event = jsonutil.loads(line)
+        except jsonutil.JSONDecodeError:
             continue
         etype = event.get("type", "")
         if etype == "message" and event.get("role") == "assistant":
@@ -634,13 +877,12 @@ def _parse_codex_json(output: str) -> str:
 
 def call_codex_full(
     prompt: str, *, model: str = "o3", traces_dir: Path | None = None,
+    lite: bool = False,
 ) -> LLMResponse:
     """Call Codex CLI and return structured response with reasoning/tool calls + trace."""
     before = _time.time()
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write(prompt)
-        prompt_file = f.name
+    prompt_file = _prompt_files.write(prompt)
     try:
         cmd = [
             "codex", "exec", "--skip-git-repo-check", "--json", "--full-auto", "-m", model,
@@ -653,7 +895,7 @@ def call_codex_full(
         if not output:
             raise RuntimeError(f"codex CLI returned no output (exit={proc.returncode}): {proc.stderr[:500]}")
     finally:
-        Path(prompt_file).unlink(missing_ok=True)
+        prompt_file.unlink(missing_ok=True)
 
     # Parse text from stdout
     text = _parse_codex_json(output)
@@ -661,10 +903,11 @@ def call_codex_full(
     # Find the session JSONL for full structured content
     session_path = _find_latest_codex_session(before)
     if session_path:
-        response = _parse_codex_session(session_path)
+        records = list(_read_jsonl(session_path))
+        response = _parse_codex_session(session_path, records, lite=lite)
         if not response.text:
             response.text = text
-        trace = _build_codex_trace(session_path)
+        trace = _build_codex_trace(session_path, records)
         response.jsonl_path = _save_trace(trace, response.session_id or str(uuid.uuid4()), traces_dir)
         return response
 
@@ -680,18 +923,27 @@ def _find_latest_gemini_session(after_ts: float) -> Path | None:
     base = Path.home() / ".gemini" / "tmp"
     if not base.exists():
         return None
-    candidates = sorted(base.rglob("session-*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
-    for c in candidates:
-        if c.stat().st_mtime >= after_ts:
-            return c
-    return None
+    return _newest_file(base, "session-*.json", after_ts)
 
 
-def _parse_gemini_session(json_path: Path) -> LLMResponse:
-    """Parse a Gemini session JSON into an LLMResponse."""
+def _load_gemini_session(json_path: Path) -> dict | None:
+    """Decode a Gemini session JSON, or None if it cannot be read."""
     try:
-        data = json.loads(json_path.read_text(errors="replace"))
-    except (json.JSONDecodeError, OSError):
+        return jsonutil.loads_utf8(json_path.read_bytes())
+    except (jsonutil.JSONDecodeError, OSError):
+        return None
+
+
+def _parse_gemini_session(
+    json_path: Path, data: dict | None = None, lite: bool = False
+) -> LLMResponse:
+    """Parse a Gemini session JSON (or its decoded ``data``) into an LLMResponse.
+
+    With ``lite``, raw_messages is left empty.
+    """
+    if data is None:
+        data = _load_gemini_session(json_path)
+    if data is None:
         return LLMResponse(backend="gemini")
 
     response = LLMResponse(
@@ -702,14 +954,16 @@ def _parse_gemini_session(json_path: Path) -> LLMResponse:
     total_usage: dict = {}
 
     for msg in data.get("messages", []):
-        if not isinstance(msg, dict):
+        if type(msg) is not dict:
             continue
-        response.raw_messages.append(msg)
-        msg_type = msg.get("type", "")
+        mg = msg.get
+        if not lite:
+            response.raw_messages.append(msg)
+        msg_type = mg("type", "")
 
         if msg_type == "gemini":
             # Thinking / thoughts
-            for thought in msg.get("thoughts", []):
+            for thought in mg("thoughts", []):
                 desc = thought.get("description", "")
                 subject = thought.get("subject", "")
                 t = f"{subject}: {desc}" if subject else desc
@@ -717,7 +971,7 @@ def _parse_gemini_session(json_path: Path) -> LLMResponse:
                     response.thinking.append(t)
 
             # Tool calls + results
-            for tc in msg.get("toolCalls", []):
+            for tc in mg("toolCalls", []):
                 name = tc.get("name", "")
                 if name:
                     response.tool_calls.append({
@@ -729,13 +983,13 @@ def _parse_gemini_session(json_path: Path) -> LLMResponse:
                     response.tool_results.append({"content": result_text})
 
             # Token usage (accumulate)
-            tokens = msg.get("tokens", {})
+            tokens = mg("tokens", {})
             if tokens:
                 for k, v in tokens.items():
                     total_usage[k] = total_usage.get(k, 0) + (v if isinstance(v, int) else 0)
 
             # Text content
-            content = msg.get("content", "")
+            content = mg("content", "")
             if isinstance(content, str) and content.strip():
                 text_parts.append(content)
 
@@ -744,11 +998,11 @@ def _parse_gemini_session(json_path: Path) -> LLMResponse:
     return response
 
 
-def _build_gemini_trace(json_path: Path) -> dict:
-    """Build a clean trace from a Gemini session JSON."""
-    try:
-        data = json.loads(json_path.read_text(errors="replace"))
-    except (json.JSONDecodeError, OSError):
+def _build_gemini_trace(json_path: Path, data: dict | None = None) -> dict:
+    """Build a clean trace from a Gemini session JSON (or its decoded ``data``)."""
+    if data is None:
+        data = _load_gemini_session(json_path)
+    if data is None:
         return {}
 
     meta = {
@@ -762,33 +1016,34 @@ def _build_gemini_trace(json_path: Path) -> dict:
     model = None
 
     for msg in data.get("messages", []):
-        if not isinstance(msg, dict):
+        if type(msg) is not dict:
             continue
-        msg_type = msg.get("type", "")
-        ts = msg.get("timestamp", "")
+        mg = msg.get
+        msg_type = mg("type", "")
+        ts = mg("timestamp", "")
 
         if msg_type == "user":
-            content = msg.get("content", "")
+            content = mg("content", "")
             if isinstance(content, str) and content.strip():
                 turns.append({"role": "user", "type": "text", "text": content, "ts": ts})
-            elif isinstance(content, list):
+            elif type(content) is list:
                 for item in content:
-                    t = item.get("text", "") if isinstance(item, dict) else str(item)
+                    t = item.get("text", "") if type(item) is dict else str(item)
                     if t.strip():
                         turns.append({"role": "user", "type": "text", "text": t, "ts": ts})
 
         elif msg_type == "gemini":
             if not model:
-                model = msg.get("model")
+                model = mg("model")
 
-            for thought in msg.get("thoughts", []):
+            for thought in mg("thoughts", []):
                 desc = thought.get("description", "")
                 subject = thought.get("subject", "")
                 t = f"{subject}: {desc}" if subject else desc
                 if t.strip():
                     turns.append({"role": "assistant", "type": "thinking", "text": t, "ts": ts})
 
-            for tc in msg.get("toolCalls", []):
+            for tc in mg("toolCalls", []):
                 name = tc.get("name", "")
                 if name:
                     turns.append({
@@ -802,12 +1057,12 @@ def _build_gemini_trace(json_path: Path) -> dict:
                         "content": result_text, "ts": ts,
                     })
 
-            tokens = msg.get("tokens", {})
+            tokens = mg("tokens", {})
             if tokens:
                 for k, v in tokens.items():
                     total_usage[k] = total_usage.get(k, 0) + (v if isinstance(v, int) else 0)
 
-            content = msg.get("content", "")
+            content = mg("content", "")
             if isinstance(content, str) and content.strip():
                 turns.append({"role": "assistant", "type": "text", "text": content, "ts": ts})
 
@@ -818,9 +1073,7 @@ def _build_gemini_trace(json_path: Path) -> dict:
 
 def call_gemini(prompt: str, *, model: str = "gemini-2.5-flash") -> str:
     """Call Gemini CLI. Returns text."""
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write(prompt)
-        prompt_file = f.name
+    prompt_file = _prompt_files.write(prompt)
     try:
         cmd = [
             "gemini",
@@ -835,18 +1088,17 @@ def call_gemini(prompt: str, *, model: str = "gemini-2.5-flash") -> str:
             raise RuntimeError(f"gemini CLI returned no output (exit={proc.returncode}): {proc.stderr[:500]}")
         return output
     finally:
-        Path(prompt_file).unlink(missing_ok=True)
+        prompt_file.unlink(missing_ok=True)
 
 
 def call_gemini_full(
     prompt: str, *, model: str = "gemini-2.5-flash", traces_dir: Path | None = None,
+    lite: bool = False,
 ) -> LLMResponse:
     """Call Gemini CLI and return structured response with thoughts/tool calls + trace."""
     before = _time.time()
 
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-        f.write(prompt)
-        prompt_file = f.name
+    prompt_file = _prompt_files.write(prompt)
     try:
         cmd = [
             "gemini",
@@ -860,17 +1112,18 @@ def call_gemini_full(
         if not output:
             raise RuntimeError(f"gemini CLI returned no output (exit={proc.returncode}): {proc.stderr[:500]}")
     finally:
-        Path(prompt_file).unlink(missing_ok=True)
+        prompt_file.unlink(missing_ok=True)
 
     text = output
 
     # Find the session JSON for full structured content
     session_path = _find_latest_gemini_session(before)
     if session_path:
-        response = _parse_gemini_session(session_path)
+        data = _load_gemini_session(session_path)
+        response = _parse_gemini_session(session_path, data, lite=lite)
         if not response.text:
             response.text = text
-        trace = _build_gemini_trace(session_path)
+        trace = _build_gemini_trace(session_path, data)
         response.jsonl_path = _save_trace(trace, response.session_id or str(uuid.uuid4()), traces_dir)
         return response
 
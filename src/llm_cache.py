@@ -0,0 +1,102 @@
+"""On-disk exact-match cache for call_llm responses.
+
+Opt-in via ``Config.llm_cache_enabled`` (``LLM_CACHE=1``).  Summarize/promote
+prompts are deterministic, so re-running a pipeline over unchanged sessions
+can reuse earlier answers instead of starting a CLI subprocess per prompt.
+Entries expire after ``Config.llm_cache_ttl`` seconds (default 7 days) and
+are deleted on the next store.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src.config import default_config
+
+logger = logging.getLogger(__name__)
+
+CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at);
+"""
+
+# One connection per process, reopened if the configured path changes
+_conn: sqlite3.Connection | None = None
+_conn_path: Path | None = None
+_conn_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return default_config().llm_cache_enabled
+
+
+def cache_key(backend: str, model: str, prompt: str) -> str:
+    """SHA-256 over backend, model and prompt (NUL-separated)."""
+    return hashlib.sha256(f"{backend}\0{model}\0{prompt}".encode()).hexdigest()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    """Return the process-wide connection; call with _conn_lock held."""
+    global _conn, _conn_path
+    if _conn is not None and _conn_path == path:
+        return _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(CACHE_SQL)
+    _conn, _conn_path = conn, path
+    return conn
+
+
+def get(key: str) -> str | None:
+    """Return the cached response for ``key`` if present and not expired.
+
+    The cache is best-effort: any storage error reads as a miss.
+    """
+    config = default_config()
+    try:
+        with _conn_lock:
+            row = _connect(config.llm_cache_path).execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, int(time.time()) - config.llm_cache_ttl),
+            ).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        logger.debug("llm cache lookup failed: %s", e)
+        return None
+    return row[0] if row else None
+
+
+def put(key: str, response: str) -> None:
+    """Store ``response`` under ``key`` and drop expired entries.
+
+    Storage errors are logged and ignored.
+    """
+    config = default_config()
+    now = int(time.time())
+    try:
+        with _conn_lock:
+            conn = _connect(config.llm_cache_path)
+            with conn:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE created_at <= ?",
+                    (now - config.llm_cache_ttl,),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, response, now),
+                )
+    except (sqlite3.Error, OSError) as e:
+        logger.debug("llm cache store failed: %s", e)
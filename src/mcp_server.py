@@ -3,7 +3,11 @@
 from __future__ import annotations
 
 import json
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
+from typing import Callable
 
 from src.db import MemoryDB
 from src.search import hybrid_search, timeline_search
@@ -21,8 +25,51 @@ def get_db() -> MemoryDB:
     return _db
 
 
-def _auto_refresh() -> None:
-    """Auto-ingest new sessions; trigger daily process on first use of the day."""
+def _utc(epoch: int, fmt: str = "%Y-%m-%d %H:%M") -> str:
+    """Format an epoch as UTC; time.gmtime skips building a datetime."""
+    return time.strftime(fmt, time.gmtime(epoch))
+
+
+# Rendered tool output keyed by (tool, arguments..., db.data_version()).
+# Agents often repeat a query within a session; any write to the database
+# changes the version, so stale entries are never returned, only evicted.
+# Search scores decay with age, so its key also carries an hourly bucket.
+_RESULT_CACHE_SIZE = 256
+_SEARCH_CACHE_BUCKET = 3600
+_result_cache: OrderedDict[tuple, str] = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+
+def _cached(key: tuple, render: Callable[[MemoryDB], str]) -> str:
+    db = get_db()
+    key = (*key, db.data_version())
+    with _result_cache_lock:
+        text = _result_cache.get(key)
+        if text is not None:
+            _result_cache.move_to_end(key)
+            return text
+    text = render(db)
+    with _result_cache_lock:
+        _result_cache[key] = text
+        if len(_result_cache) > _RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+    return text
+
+
+# Minimum seconds between auto-ingests; a burst of tool calls from one
+# agent turn would otherwise rescan every session file per call
+_REFRESH_TTL = 30.0
+_last_refresh = float("-inf")
+
+
+def _auto_refresh(force: bool = False) -> dict | None:
+    """Auto-ingest new sessions; trigger daily process on first use of the day.
+
+    Ingest runs at most once per _REFRESH_TTL seconds unless ``force``.
+    Returns the auto_ingest result, or None if ingest was skipped or left
+    to the background daily process.
+    """
+    global _last_refresh
     from src.auto import (
         _should_run_daily,
         auto_ingest,
@@ -34,9 +81,13 @@ def _auto_refresh() -> None:
     # Daily process: first use today → full pipeline in background
     if _should_run_daily():
         daily_auto_process_background()
-        return  # daily process handles ingest/summarize/promote itself
+        return None  # daily process handles ingest/summarize/promote itself
 
     # Lightweight path: just ingest + summarize new sessions
+    now = time.monotonic()
+    if not force and now - _last_refresh < _REFRESH_TTL:
+        return None
+    _last_refresh = now
     db = get_db()
     result = auto_ingest(db)
 
@@ -44,6 +95,24 @@ def _auto_refresh() -> None:
         summarize_new_sessions_background(result["new_session_ids"])
 
     promote_background()
+    return result
+
+
+def _do_refresh() -> str:
+    try:
+        result = _auto_refresh(force=True)
+    except Exception as e:
+        return f"Refresh failed: {e}"
+    if result is None:
+        return (
+            "Daily processing started in the background; "
+            "new sessions will be searchable when it finishes."
+        )
+    return (
+        f"Ingested {result['sessions']} new sessions "
+        f"({result['messages']} messages), "
+        f"{len(result['updated_session_ids'])} updated."
+    )
 
 
 def _do_search(
@@ -53,7 +122,6 @@ def _do_search(
     after: str | None = None,
 ) -> str:
     _auto_refresh()
-    db = get_db()
     after_epoch = None
     if after:
         try:
@@ -61,20 +129,36 @@ def _do_search(
             after_epoch = int(dt.timestamp())
         except ValueError:
             pass
+    return _cached(
+        (
+            "search", query, limit, project, after_epoch,
+            int(time.time() // _SEARCH_CACHE_BUCKET),
+        ),
+        lambda db: _render_search(db, query, limit, project, after_epoch),
+    )
 
+
+def _render_search(
+    db: MemoryDB,
+    query: str,
+    limit: int,
+    project: str | None,
+    after_epoch: int | None,
+) -> str:
     results = hybrid_search(db, query, limit=limit, project_path=project, after=after_epoch)
     if not results:
         return "No matching sessions found."
 
     output = []
     for r in results:
-        ts = datetime.fromtimestamp(r.first_message_at, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+        summary = f"Summary: {r.summary[:200]}..." if r.summary else ""
+        match = r.matching_snippets[0][:150] if r.matching_snippets else ""
         output.append(
             f"**{r.title or 'Untitled'}** (score: {r.score:.2f})\n"
             f"  Session: {r.session_id} | Source: {r.source} | Project: {r.project_name or 'N/A'}\n"
-            f"  Date: {ts}\n"
-            f"  {'Summary: ' + r.summary[:200] + '...' if r.summary else ''}\n"
-            f"  Match: {r.matching_snippets[0][:150] if r.matching_snippets else ''}"
+            f"  Date: {_utc(r.first_message_at)}\n"
+            f"  {summary}\n"
+            f"  Match: {match}"
         )
     return "\n\n".join(output)
 
@@ -86,7 +170,6 @@ def _do_timeline(
     limit: int = 20,
 ) -> str:
     _auto_refresh()
-    db = get_db()
     after_epoch = None
     before_epoch = None
     if after:
@@ -101,14 +184,26 @@ def _do_timeline(
             before_epoch = int(dt.timestamp())
         except ValueError:
             pass
+    return _cached(
+        ("timeline", project, after_epoch, before_epoch, limit),
+        lambda db: _render_timeline(db, project, after_epoch, before_epoch, limit),
+    )
+
 
+def _render_timeline(
+    db: MemoryDB,
+    project: str | None,
+    after_epoch: int | None,
+    before_epoch: int | None,
+    limit: int,
+) -> str:
     results = timeline_search(db, project_path=project, after=after_epoch, before=before_epoch, limit=limit)
     if not results:
         return "No sessions found for the given criteria."
 
     output = []
     for r in results:
-        ts = datetime.fromtimestamp(r["first_message_at"], tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+        ts = _utc(r["first_message_at"])
         line = (
             f"[{ts}] **{r['title'] or 'Untitled'}**\n"
             f"  {r['source']} | {r['project_name'] or 'N/A'} | "
@@ -122,15 +217,22 @@ def _do_timeline(
 
 def _do_project_context(project_path: str) -> str:
     _auto_refresh()
-    db = get_db()
+    return _cached(
+        ("project_context", project_path),
+        lambda db: _render_project_context(db, project_path),
+    )
+
+
+def _render_project_context(db: MemoryDB, project_path: str) -> str:
     l1_text = select_l1_context(db, project_path, budget_tokens=2000)
 
     sessions = db.list_sessions(project_path=project_path, limit=5)
+    summaries = db.get_summaries_bulk([s["id"] for s in sessions])
     summary_lines = []
     for s in sessions:
-        summary = db.get_summary(s["id"])
+        summary = summaries.get(s["id"])
         if summary:
-            ts = datetime.fromtimestamp(s["first_message_at"], tz=timezone.utc).strftime("%Y-%m-%d")
+            ts = _utc(s["first_message_at"], "%Y-%m-%d")
             summary_lines.append(
                 f"### {s.get('title', 'Untitled')} ({ts})\n{summary['summary_text'][:300]}"
             )
@@ -148,7 +250,13 @@ def _do_project_context(project_path: str) -> str:
 
 def _do_recall_session(session_id: str) -> str:
     _auto_refresh()
-    db = get_db()
+    return _cached(
+        ("recall_session", session_id),
+        lambda db: _render_recall_session(db, session_id),
+    )
+
+
+def _render_recall_session(db: MemoryDB, session_id: str) -> str:
     session = db.get_session(session_id)
     if not session:
         return f"Session not found: {session_id}"
@@ -156,7 +264,7 @@ def _do_recall_session(session_id: str) -> str:
     messages = db.get_session_messages(session_id)
     summary = db.get_summary(session_id)
 
-    ts = datetime.fromtimestamp(session["first_message_at"], tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+    ts = _utc(session["first_message_at"])
 
     output = [
         f"# Session: {session.get('title', 'Untitled')}",
@@ -280,4 +388,13 @@ def run_server():
         """
         return _do_recall_session(session_id)
 
+    @mcp.tool()
+    def memory_refresh() -> str:
+        """Ingest new and updated sessions now.
+
+        Other tools re-ingest at most every 30 seconds; call this first when a
+        session that just ended must show up in the next search.
+        """
+        return _do_refresh()
+
     mcp.run()
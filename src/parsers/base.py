@@ -2,18 +2,33 @@
 
 from __future__ import annotations
 
-import json
+import multiprocessing
+import os
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
+
+from src import jsonutil
 
 
 TOOL_OUTPUT_TRUNCATE = 500
 
+# Batches with fewer files than this are parsed in-process; below it the
+# process pool start-up costs more than it saves.
+PARALLEL_PARSE_MIN_FILES = 16
+
+# Workers are spawned, not forked: ingest runs inside the threaded MCP
+# server, and forking a process with live threads can deadlock the child.
+_POOL_CONTEXT = multiprocessing.get_context("spawn")
 
-@dataclass
+
+@dataclass(slots=True)
 class ParsedMessage:
     """A normalized message from any CLI tool."""
 
@@ -40,7 +55,7 @@ class ParsedMessage:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ParsedSession:
     """Normalized session metadata + messages from any CLI tool."""
 
@@ -61,6 +76,8 @@ class ParsedSession:
     raw_path: str | None = None
     title: str | None = None
     messages: list[ParsedMessage] = field(default_factory=list)
+    # Byte offset a later parse_incremental() may resume from (0: none)
+    parsed_offset: int = 0
 
     def to_session_dict(self) -> dict[str, Any]:
         return {
@@ -77,7 +94,7 @@ class ParsedSession:
             "user_message_count": self.user_message_count,
             "total_tokens": self.total_tokens,
             "compaction_count": self.compaction_count,
-            "tools_used": json.dumps(sorted(set(self.tools_used))),
+            "tools_used": jsonutil.dumps(sorted(set(self.tools_used))),
             "tier": "L3",
             "raw_path": self.raw_path,
             "ingested_at": int(time.time()),
@@ -92,11 +109,43 @@ def truncate(text: str, max_len: int = TOOL_OUTPUT_TRUNCATE) -> str:
     return text[:max_len] + "…[truncated]"
 
 
+@lru_cache(maxsize=4096)
+def _day_epoch(date: str) -> int | None:
+    """Epoch of 00:00 UTC on a "YYYY-MM-DD" date, or None if there is no such day.
+
+    Timestamps within a session share a handful of dates, so the datetime
+    construction is paid once per date instead of once per record.
+    """
+    try:
+        dt = datetime(int(date[0:4]), int(date[5:7]), int(date[8:10]), tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return int(dt.timestamp())
+
+
 def iso_to_epoch(ts: str) -> int:
     """Convert ISO8601 timestamp string to unix epoch seconds."""
-    from datetime import datetime, timezone
-
     ts = ts.rstrip("Z").split("+")[0]
+
+    # Fast path: fixed-width "YYYY-MM-DDTHH:MM:SS[.ffffff]", which is what
+    # every supported CLI writes.  Anything else goes through strptime.
+    if len(ts) >= 19 and ts[10] == "T" and ts[4] == ts[7] == "-" and ts[13] == ts[16] == ":":
+        digits = ts[0:4] + ts[5:7] + ts[8:10] + ts[11:13] + ts[14:16] + ts[17:19]
+        frac = ts[20:]
+        if (
+            digits.isascii() and digits.isdigit()
+            and (len(ts) == 19 or (
+                ts[19] == "." and 0 < len(frac) <= 6
+                and frac.isascii() and frac.isdigit()
+            ))
+            and "1970" <= digits[0:4] < "2100"
+        ):
+            day = _day_epoch(ts[:10])
+            hour, minute, second = int(digits[8:10]), int(digits[10:12]), int(digits[12:14])
+            if day is None or hour > 23 or minute > 59 or second > 59:
+                return 0
+            return day + hour * 3600 + minute * 60 + second
+
     # Handle both formats: with and without microseconds
     for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
         try:
@@ -107,8 +156,16 @@ def iso_to_epoch(ts: str) -> int:
     return 0
 
 
+# Directories whose direct children are treated as project roots
+_PROJECT_CONTAINER_DIRS = frozenset(("Code", "Projects", "src", "repos", "workspace"))
+
+
+@lru_cache(maxsize=2048)
 def infer_project_from_cwd(cwd: str | None) -> tuple[str | None, str | None]:
-    """Infer project_path and project_name from cwd."""
+    """Infer project_path and project_name from cwd.
+
+    Memoized: sessions of one project share a handful of cwds.
+    """
     if not cwd:
         return None, None
     path = Path(cwd)
@@ -121,7 +178,7 @@ def infer_project_from_cwd(cwd: str | None) -> tuple[str | None, str | None]:
     # Use the first directory under ~/Code/ or similar
     parts = path.parts
     for i, part in enumerate(parts):
-        if part in ("Code", "Projects", "src", "repos", "workspace"):
+        if part in _PROJECT_CONTAINER_DIRS:
             if i + 1 < len(parts):
                 project_path = str(Path(*parts[: i + 2]))
                 project_name = parts[i + 1]
@@ -130,6 +187,67 @@ def infer_project_from_cwd(cwd: str | None) -> tuple[str | None, str | None]:
     return str(path), path.name
 
 
+def path_sort_key(path: str | os.PathLike) -> list[str]:
+    """Sort key ordering paths as ``sorted(list[Path])`` does on POSIX.
+
+    Comparing the split path strings avoids a Python-level
+    ``PurePath.__lt__`` call per comparison.
+    """
+    return os.fspath(path).split(os.sep)
+
+
+def find_files(base: Path, prefix: str, suffix: str) -> list[Path]:
+    """Recursively find files named ``{prefix}*{suffix}`` under ``base``, sorted.
+
+    An os.scandir walk: entries carry their file type, so unlike
+    ``Path.rglob`` there is no stat or fnmatch per entry.  Symlinked
+    directories are not descended into, as with rglob.
+    """
+    found: list[str] = []
+    min_len = len(prefix) + len(suffix)
+    stack = [os.fspath(base)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif (
+                    len(name) >= min_len
+                    and name.startswith(prefix)
+                    and name.endswith(suffix)
+                    and entry.is_file()
+                ):
+                    found.append(entry.path)
+    return [Path(f) for f in sorted(found, key=path_sort_key)]
+
+
+def file_signature(file_path: Path) -> tuple[float, int] | None:
+    """(mtime, size) used to detect unchanged session files, or None."""
+    try:
+        st = file_path.stat()
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def _parse_one(
+    parser: SessionParser, file_path: Path
+) -> tuple[ParsedSession | None, str | None]:
+    """Parse one file, returning (session, error) instead of raising.
+
+    Module-level so it can be pickled into ProcessPoolExecutor workers.
+    """
+    try:
+        return parser.parse(file_path), None
+    except Exception as e:
+        return None, str(e)
+
+
 class SessionParser(ABC):
     """Abstract base for session file parsers."""
 
@@ -143,16 +261,75 @@ class SessionParser(ABC):
         """Find all session files under the given base paths."""
         ...
 
-    def read_jsonl(self, file_path: Path) -> list[dict]:
-        """Read a JSONL file, skipping malformed lines."""
-        lines = []
-        with open(file_path, "r", errors="replace") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
+    def parse_incremental(
+        self, file_path: Path, offset: int, base: dict[str, Any]
+    ) -> ParsedSession | None:
+        """Parse records appended after ``offset`` on top of a stored session.
+
+        ``base`` is the session row from the previous parse.  The result holds
+        only the new messages (ordinals continue from ``base``) with session
+        totals covering the whole file.  Formats that cannot resume (and so
+        never set ``parsed_offset``) get a full parse.
+        """
+        return self.parse(file_path)
+
+    def parse_all(
+        self, file_paths: list[Path], max_workers: int | None = None
+    ) -> Iterator[tuple[ParsedSession | None, str | None]]:
+        """Parse many files, yielding (session, error) for each, in order.
+
+        Parsing is CPU-bound, so large batches are spread over a process
+        pool.  Small batches, or a pool that cannot start, are parsed
+        in-process.
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        done = 0
+        if max_workers > 1 and len(file_paths) >= PARALLEL_PARSE_MIN_FILES:
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=max_workers, mp_context=_POOL_CONTEXT
+                ) as ex:
+                    for result in ex.map(
+                        _parse_one, repeat(self), file_paths, chunksize=8
+                    ):
+                        yield result
+                        done += 1
+                return
+            except Exception:
+                # Pool failures (start-up, a dead worker, pickling) are not
+                # per-file errors: parse whatever is left in-process
+                pass
+        for file_path in file_paths[done:]:
+            yield _parse_one(self, file_path)
+
+    def read_jsonl(self, file_path: Path) -> Iterator[dict]:
+        """Stream records from a JSONL file, skipping malformed lines."""
+        for rec, _end in self.read_jsonl_from(file_path):
+            yield rec
+
+    def read_jsonl_from(
+        self, file_path: Path, offset: int = 0
+    ) -> Iterator[tuple[dict, int | None]]:
+        """Stream (record, end) pairs from a JSONL file, starting at ``offset``.
+
+        Lines are read as bytes through a buffered reader and parsed one at a
+        time, so memory is bounded by the longest line, not the file size.
+        ``end`` is the byte offset just past the record's newline, or None
+        for a final line with no newline yet (possibly still being written).
+        """
+        with open(file_path, "rb", buffering=1 << 16) as f:
+            if offset:
+                f.seek(offset)
+            pos = offset
+            for raw in f:
+                pos += len(raw)
+                end = pos if raw.endswith(b"\n") else None
+                line = raw.strip()
+                if line[:1] not in (b"{", b"["):
+                    continue  # blank, or cannot be a JSON record
                 try:
-                    lines.append(json.loads(line))
-                except json.JSONDecodeError:
+                    rec = jsonutil.loads_utf8(line)
+                except jsonutil.JSONDecodeError:
                     continue
-        return lines
+                yield rec, end
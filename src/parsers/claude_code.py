@@ -2,18 +2,24 @@
 
 from __future__ import annotations
 
-import json
+import os
 from pathlib import Path
+from typing import Any, Callable
 
+from src import jsonutil
 from src.parsers.base import (
     ParsedMessage,
     ParsedSession,
     SessionParser,
     infer_project_from_cwd,
     iso_to_epoch,
+    path_sort_key,
     truncate,
 )
 
+# Record types that carry no conversation content
+_SKIP_TYPES = frozenset(("file-history-snapshot", "queue-operation", "progress"))
+
 
 class ClaudeCodeParser(SessionParser):
     """Parses Claude Code session JSONL files.
@@ -32,20 +38,50 @@ class ClaudeCodeParser(SessionParser):
             if not base.exists():
                 continue
             # Find all JSONL files directly under project directories
-            # (not in subagent subdirectories)
-            for project_dir in base.iterdir():
-                if not project_dir.is_dir():
-                    continue
-                for f in project_dir.iterdir():
-                    if f.suffix == ".jsonl" and f.is_file():
-                        files.append(f)
-        return sorted(files)
+            # (not in subagent subdirectories).  scandir entries carry their
+            # file type, so the is_dir()/is_file() checks need no stat call.
+            with os.scandir(base) as project_dirs:
+                for project_dir in project_dirs:
+                    if not project_dir.is_dir():
+                        continue
+                    with os.scandir(project_dir.path) as entries:
+                        for f in entries:
+                            name = f.name
+                            if (
+                                name.endswith(".jsonl")
+                                and name != ".jsonl"
+                                and f.is_file()
+                            ):
+                                files.append(f.path)
+        return [Path(f) for f in sorted(files, key=path_sort_key)]
 
     def parse(self, file_path: Path) -> ParsedSession | None:
-        records = self.read_jsonl(file_path)
-        if not records:
-            return None
-
+        return self._parse(file_path)
+
+    def parse_incremental(
+        self, file_path: Path, offset: int, base: dict[str, Any]
+    ) -> ParsedSession | None:
+        """Parse only the lines appended since ``offset`` (files are append-only).
+
+        Falls back to a full parse if ``offset`` no longer ends a line, i.e.
+        the file was truncated or rewritten since it was last parsed.
+        """
+        try:
+            with open(file_path, "rb") as f:
+                f.seek(offset - 1)
+                at_line_end = offset > 0 and f.read(1) == b"\n"
+        except (OSError, ValueError):
+            at_line_end = False
+        if not at_line_end:
+            return self._parse(file_path)
+        return self._parse(file_path, offset, base)
+
+    def _parse(
+        self,
+        file_path: Path,
+        offset: int = 0,
+        base: dict[str, Any] | None = None,
+    ) -> ParsedSession | None:
         session_id = None
         cwd = None
         model = None
@@ -57,46 +93,86 @@ class ClaudeCodeParser(SessionParser):
         ordinal = 0
         first_ts = 0
         last_ts = 0
+        # ts_str[:19] of the records that set first_ts / last_ts
+        first_key = "\uffff"
+        last_key = ""
         user_msg_count = 0
         title = None
 
-        for rec in records:
-            rec_type = rec.get("type", "")
-            ts_str = rec.get("timestamp", "")
+        if base is not None:
+            # Continue from the previously stored session
+            session_id = base["id"]
+            cwd = base["cwd"]
+            model = base["model"]
+            git_branch = base["git_branch"]
+            tools_used = jsonutil.loads(base["tools_used"] or "[]")
+            total_tokens = base["total_tokens"] or 0
+            ordinal = base["message_count"] or 0
+            first_ts = base["first_message_at"] or 0
+            last_ts = base["last_message_at"] or 0
+            user_msg_count = base["user_message_count"] or 0
+            title = base["title"]
+
+        # Resume point for the next incremental parse: just past the last
+        # complete line.  A final line without a newline that still parsed is
+        # consumed, so the file can only be re-parsed in full afterwards.
+        resume = offset
+        resumable = True
+        saw_any = base is not None
+        for rec, end in self.read_jsonl_from(file_path, offset):
+            saw_any = True
+            if end is None:
+                resumable = False
+            else:
+                resume = end
+            rg = rec.get
+            rec_type = rg("type", "")
+            ts_str = rg("timestamp", "")
+
+            # Non-message types only contribute to the session time span.
+            # ISO-8601 second prefixes sort chronologically, so a timestamp
+            # inside the span seen so far cannot move it: skip parsing it.
+            if rec_type in _SKIP_TYPES and (
+                not ts_str or first_key <= ts_str[:19] <= last_key
+            ):
+                continue
+
             ts = iso_to_epoch(ts_str) if ts_str else 0
             if ts and (first_ts == 0 or ts < first_ts):
                 first_ts = ts
+                first_key = ts_str[:19]
             if ts and ts > last_ts:
                 last_ts = ts
+                last_key = ts_str[:19]
 
-            # Skip non-message types
-            if rec_type in ("file-history-snapshot", "queue-operation", "progress"):
+            if rec_type in _SKIP_TYPES:
                 continue
 
             # Extract session metadata from any message
             if not session_id:
-                session_id = rec.get("sessionId")
+                session_id = rg("sessionId")
             if not cwd:
-                cwd = rec.get("cwd")
+                cwd = rg("cwd")
             if not git_branch:
-                git_branch = rec.get("gitBranch")
+                git_branch = rg("gitBranch")
 
-            message = rec.get("message", {})
+            message = rg("message")
             if not message:
                 continue
+            mg = message.get
 
             if not model:
-                model = message.get("model")
+                model = mg("model")
 
-            role = message.get("role", "")
-            content = message.get("content", "")
+            content = mg("content", "")
 
             # Track token usage
-            usage = message.get("usage", {})
+            usage = mg("usage")
             if usage:
-                out_tokens = usage.get("output_tokens", 0)
-                in_tokens = usage.get("input_tokens", 0)
-                total_tokens = max(total_tokens, in_tokens + out_tokens)
+                ug = usage.get
+                total_tokens = max(
+                    total_tokens, ug("input_tokens", 0) + ug("output_tokens", 0)
+                )
 
             if rec_type == "user":
                 parsed = self._parse_user_content(content, ordinal, ts)
@@ -117,6 +193,9 @@ class ClaudeCodeParser(SessionParser):
                     if msg.tool_name:
                         tools_used.append(msg.tool_name)
 
+        if not saw_any:
+            return None
+
         if not session_id:
             # Derive from filename
             session_id = file_path.stem
@@ -138,147 +217,162 @@ class ClaudeCodeParser(SessionParser):
             git_branch=git_branch,
             first_message_at=first_ts,
             last_message_at=last_ts,
-            message_count=len(messages),
+            message_count=ordinal,
             user_message_count=user_msg_count,
             total_tokens=total_tokens,
             tools_used=tools_used,
             raw_path=str(file_path),
             title=title,
             messages=messages,
+            parsed_offset=resume if resumable else 0,
         )
 
     def _parse_user_content(
         self, content: str | list | dict, ordinal: int, ts: int
     ) -> list[ParsedMessage]:
         """Parse user message content, which can be string or array."""
-        msgs: list[ParsedMessage] = []
-
-        if isinstance(content, str):
-            if content.strip():
-                msgs.append(
-                    ParsedMessage(
-                        ordinal=ordinal,
-                        role="user",
-                        content_type="text",
-                        content_text=content,
-                        created_at=ts,
-                    )
-                )
-            return msgs
-
-        if isinstance(content, list):
-            for item in content:
-                if not isinstance(item, dict):
-                    continue
-                item_type = item.get("type", "")
-
-                if item_type == "text":
-                    text = item.get("text", "")
-                    if text.strip():
-                        msgs.append(
-                            ParsedMessage(
-                                ordinal=ordinal + len(msgs),
-                                role="user",
-                                content_type="text",
-                                content_text=text,
-                                created_at=ts,
-                            )
-                        )
-
-                elif item_type == "tool_result":
-                    result_content = item.get("content", "")
-                    if isinstance(result_content, list):
-                        # Extract text from content blocks
-                        parts = []
-                        for block in result_content:
-                            if isinstance(block, dict) and block.get("type") == "text":
-                                parts.append(block.get("text", ""))
-                        result_content = "\n".join(parts)
-                    msgs.append(
-                        ParsedMessage(
-                            ordinal=ordinal + len(msgs),
-                            role="tool",
-                            content_type="tool_result",
-                            content_text=truncate(str(result_content)),
-                            content_json=json.dumps(
-                                {"tool_use_id": item.get("tool_use_id")}
-                            ),
-                            created_at=ts,
-                        )
-                    )
-
-        return msgs
+        return _parse_content(content, ordinal, ts, "user", _USER_HANDLERS)
 
     def _parse_assistant_content(
         self, content: str | list | dict, ordinal: int, ts: int
     ) -> list[ParsedMessage]:
         """Parse assistant message content blocks."""
-        msgs: list[ParsedMessage] = []
-
-        if isinstance(content, str):
-            if content.strip():
-                msgs.append(
-                    ParsedMessage(
-                        ordinal=ordinal,
-                        role="assistant",
-                        content_type="text",
-                        content_text=content,
-                        created_at=ts,
-                    )
-                )
-            return msgs
-
-        if isinstance(content, list):
-            for item in content:
-                if not isinstance(item, dict):
-                    continue
-                item_type = item.get("type", "")
-
-                if item_type == "text":
-                    text = item.get("text", "")
-                    if text.strip():
-                        msgs.append(
-                            ParsedMessage(
-                                ordinal=ordinal + len(msgs),
-                                role="assistant",
-                                content_type="text",
-                                content_text=text,
-                                created_at=ts,
-                            )
-                        )
-
-                elif item_type == "thinking":
-                    text = item.get("thinking", "")
-                    if text.strip():
-                        msgs.append(
-                            ParsedMessage(
-                                ordinal=ordinal + len(msgs),
-                                role="assistant",
-                                content_type="thinking",
-                                content_text=truncate(text, 1000),
-                                created_at=ts,
-                            )
-                        )
-
-                elif item_type == "tool_use":
-                    name = item.get("name", "")
-                    inp = item.get("input", {})
-                    msgs.append(
-                        ParsedMessage(
-                            ordinal=ordinal + len(msgs),
-                            role="assistant",
-                            content_type="tool_call",
-                            content_text=truncate(json.dumps(inp), 500),
-                            content_json=json.dumps(
-                                {
-                                    "id": item.get("id"),
-                                    "name": name,
-                                    "input": truncate(json.dumps(inp), 1000),
-                                }
-                            ),
-                            tool_name=name,
-                            created_at=ts,
-                        )
-                    )
+        return _parse_content(
+            content, ordinal, ts, "assistant", _ASSISTANT_HANDLERS
+        )
+
+
+# Content block handlers: (block, ordinal, ts) -> message, or None to skip
+_BlockHandler = Callable[[dict, int, int], ParsedMessage | None]
+
+
+def _parse_content(
+    content: str | list | dict,
+    ordinal: int,
+    ts: int,
+    role: str,
+    handlers: dict[str, _BlockHandler],
+) -> list[ParsedMessage]:
+    """Turn a message's content (string or block array) into messages.
 
+    Blocks are dispatched on their "type" through ``handlers``; unknown
+    types are ignored.
+    """
+    msgs: list[ParsedMessage] = []
+
+    if isinstance(content, str):
+        if content.strip():
+            msgs.append(
+                ParsedMessage(
+                    ordinal=ordinal,
+                    role=role,
+                    content_type="text",
+                    content_text=content,
+                    created_at=ts,
+                )
+            )
         return msgs
+
+    if isinstance(content, list):
+        get_handler = handlers.get
+        for item in content:
+            if not isinstance(item, dict):
+                continue
+            item_type = item.get("type", "")
+            handler = get_handler(item_type) if isinstance(item_type, str) else None
+            if handler is None:
+                continue
+            msg = handler(item, ordinal + len(msgs), ts)
+            if msg is not None:
+                msgs.append(msg)
+
+    return msgs
+
+
+def _user_text(item: dict, ordinal: int, ts: int) -> ParsedMessage | None:
+    text = item.get("text", "")
+    if not text.strip():
+        return None
+    return ParsedMessage(
+        ordinal=ordinal,
+        role="user",
+        content_type="text",
+        content_text=text,
+        created_at=ts,
+    )
+
+
+def _user_tool_result(item: dict, ordinal: int, ts: int) -> ParsedMessage:
+    result_content = item.get("content", "")
+    if isinstance(result_content, list):
+        # Extract text from content blocks
+        parts = []
+        for block in result_content:
+            if isinstance(block, dict) and block.get("type") == "text":
+                parts.append(block.get("text", ""))
+        result_content = "\n".join(parts)
+    return ParsedMessage(
+        ordinal=ordinal,
+        role="tool",
+        content_type="tool_result",
+        content_text=truncate(str(result_content)),
+        content_json=jsonutil.dumps({"tool_use_id": item.get("tool_use_id")}),
+        created_at=ts,
+    )
+
+
+def _assistant_text(item: dict, ordinal: int, ts: int) -> ParsedMessage | None:
+    text = item.get("text", "")
+    if not text.strip():
+        return None
+    return ParsedMessage(
+        ordinal=ordinal,
+        role="assistant",
+        content_type="text",
+        content_text=text,
+        created_at=ts,
+    )
+
+
+def _assistant_thinking(item: dict, ordinal: int, ts: int) -> ParsedMessage | None:
+    text = item.get("thinking", "")
+    if not text.strip():
+        return None
+    return ParsedMessage(
+        ordinal=ordinal,
+        role="assistant",
+        content_type="thinking",
+        content_text=truncate(text, 1000),
+        created_at=ts,
+    )
+
+
+def _assistant_tool_use(item: dict, ordinal: int, ts: int) -> ParsedMessage:
+    name = item.get("name", "")
+    inp_json = jsonutil.dumps(item.get("input", {}))
+    return ParsedMessage(
+        ordinal=ordinal,
+        role="assistant",
+        content_type="tool_call",
+        content_text=truncate(inp_json, 500),
+        content_json=jsonutil.dumps(
+            {
+                "id": item.get("id"),
+                "name": name,
+                "input": truncate(inp_json, 1000),
+            }
+        ),
+        tool_name=name,
+        created_at=ts,
+    )
+
+
+_USER_HANDLERS: dict[str, _BlockHandler] = {
+    "text": _user_text,
+    "tool_result": _user_tool_result,
+}
+_ASSISTANT_HANDLERS: dict[str, _BlockHandler] = {
+    "text": _assistant_text,
+    "thinking": _assistant_thinking,
+    "tool_use": _assistant_tool_use,
+}
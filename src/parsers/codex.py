@@ -2,19 +2,30 @@
 
 from __future__ import annotations
 
-import json
 from pathlib import Path
 
+from src import jsonutil
 from src.parsers.base import (
     ParsedMessage,
     ParsedSession,
     SessionParser,
+    find_files,
     infer_project_from_cwd,
     iso_to_epoch,
     truncate,
 )
 
 
+# Injected context that is never used as a session title
+_CONTEXT_PREFIXES = (
+    "<environment_context>",
+    "# AGENTS.md",
+    "# Context from my IDE",
+    "<INSTRUCTIONS>",
+    "<permissions",
+)
+
+
 class CodexParser(SessionParser):
     """Parses Codex session JSONL files.
 
@@ -31,14 +42,10 @@ class CodexParser(SessionParser):
             base = base.expanduser()
             if not base.exists():
                 continue
-            files.extend(sorted(base.rglob("rollout-*.jsonl")))
+            files.extend(find_files(base, "rollout-", ".jsonl"))
         return files
 
     def parse(self, file_path: Path) -> ParsedSession | None:
-        records = self.read_jsonl(file_path)
-        if not records:
-            return None
-
         # Extract session metadata
         session_id = None
         cwd = None
@@ -54,9 +61,16 @@ class CodexParser(SessionParser):
         user_msg_count = 0
         title = None
 
-        for rec in records:
+        saw_any = False
+        # Records written in one burst repeat the previous timestamp string
+        prev_ts_str = None
+        ts = 0
+        for rec in self.read_jsonl(file_path):
+            saw_any = True
             ts_str = rec.get("timestamp", "")
-            ts = iso_to_epoch(ts_str) if ts_str else 0
+            if ts_str != prev_ts_str:
+                prev_ts_str = ts_str
+                ts = iso_to_epoch(ts_str) if ts_str else 0
             if ts and (first_ts == 0 or ts < first_ts):
                 first_ts = ts
             if ts and ts > last_ts:
@@ -85,11 +99,7 @@ class CodexParser(SessionParser):
                         if title is None and msg.content_text:
                             # Use first non-context, non-system user message as title
                             text = msg.content_text.strip()
-                            if (not text.startswith("<environment_context>")
-                                    and not text.startswith("# AGENTS.md")
-                                    and not text.startswith("# Context from my IDE")
-                                    and not text.startswith("<INSTRUCTIONS>")
-                                    and not text.startswith("<permissions")
+                            if (not text.startswith(_CONTEXT_PREFIXES)
                                     and len(text) < 2000):  # Skip large instruction blocks
                                 title = text[:200]
                     if msg.tool_name:
@@ -122,6 +132,9 @@ class CodexParser(SessionParser):
                         if usage:
                             total_tokens = usage.get("total_tokens", total_tokens)
 
+        if not saw_any:
+            return None
+
         if not session_id:
             # Derive session ID from filename
             session_id = file_path.stem.replace("rollout-", "")
@@ -204,7 +217,7 @@ class CodexParser(SessionParser):
                 role="assistant",
                 content_type="tool_call",
                 content_text=truncate(args, 500),
-                content_json=json.dumps(
+                content_json=jsonutil.dumps(
                     {"name": name, "arguments": args, "call_id": payload.get("call_id")}
                 ),
                 tool_name=name,
@@ -218,7 +231,7 @@ class CodexParser(SessionParser):
                 role="tool",
                 content_type="tool_result",
                 content_text=truncate(output),
-                content_json=json.dumps(
+                content_json=jsonutil.dumps(
                     {"call_id": payload.get("call_id"), "output": truncate(output, 1000)}
                 ),
                 created_at=ts,
@@ -226,14 +239,14 @@ class CodexParser(SessionParser):
 
         elif ptype == "custom_tool_call":
             name = payload.get("name", "")
-            inp = payload.get("input", "")
+            inp = str(payload.get("input", ""))
             return ParsedMessage(
                 ordinal=ordinal,
                 role="assistant",
                 content_type="tool_call",
-                content_text=truncate(str(inp), 500),
-                content_json=json.dumps(
-                    {"name": name, "input": truncate(str(inp), 1000), "call_id": payload.get("call_id")}
+                content_text=truncate(inp, 500),
+                content_json=jsonutil.dumps(
+                    {"name": name, "input": truncate(inp, 1000), "call_id": payload.get("call_id")}
                 ),
                 tool_name=name,
                 created_at=ts,
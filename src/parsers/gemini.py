@@ -3,18 +3,25 @@
 from __future__ import annotations
 
 import hashlib
-import json
 from pathlib import Path
 
+from src import jsonutil
 from src.parsers.base import (
     ParsedMessage,
     ParsedSession,
     SessionParser,
+    find_files,
     iso_to_epoch,
     truncate,
 )
 
 
+# ((path, mtime_ns, size) of trustedFolders.json, hash->path mapping).
+# Shared by every parser in the process: parse_all hands each pool chunk a
+# fresh unpickled GeminiParser, whose own cache starts out empty.
+_trusted_folders_cache: tuple[tuple[str, int, int], dict[str, str]] | None = None
+
+
 def _load_trusted_folders() -> dict[str, str]:
     """Load ~/.gemini/trustedFolders.json and build hash->path mapping.
 
@@ -22,17 +29,24 @@ def _load_trusted_folders() -> dict[str, str]:
     trustedFolders.json maps known project paths to their trust status,
     so we can reverse the hash to recover the original path.
     """
+    global _trusted_folders_cache
     tf_path = Path.home() / ".gemini" / "trustedFolders.json"
-    if not tf_path.exists():
+    try:
+        st = tf_path.stat()
+    except OSError:
         return {}
+    key = (str(tf_path), st.st_mtime_ns, st.st_size)
+    if _trusted_folders_cache is not None and _trusted_folders_cache[0] == key:
+        return _trusted_folders_cache[1]
     try:
-        data = json.loads(tf_path.read_text())
-    except (json.JSONDecodeError, OSError):
+        data = jsonutil.loads(tf_path.read_text())
+    except (jsonutil.JSONDecodeError, OSError):
         return {}
     mapping: dict[str, str] = {}
     for folder_path in data:
         h = hashlib.sha256(folder_path.encode()).hexdigest()
         mapping[h] = folder_path
+    _trusted_folders_cache = (key, mapping)
     return mapping
 
 
@@ -62,13 +76,13 @@ class GeminiParser(SessionParser):
             base = base.expanduser()
             if not base.exists():
                 continue
-            files.extend(sorted(base.rglob("session-*.json")))
+            files.extend(find_files(base, "session-", ".json"))
         return files
 
     def parse(self, file_path: Path) -> ParsedSession | None:
         try:
-            data = json.loads(file_path.read_text(errors="replace"))
-        except (json.JSONDecodeError, OSError):
+            data = jsonutil.loads_utf8(file_path.read_bytes())
+        except (jsonutil.JSONDecodeError, OSError):
             return None
 
         if not isinstance(data, dict):
@@ -153,14 +167,15 @@ class GeminiParser(SessionParser):
                     result = tc.get("result", "")
                     if tool_name:
                         tools_used.append(tool_name)
+                        args_json = jsonutil.dumps(args)
                         messages.append(ParsedMessage(
                             ordinal=ordinal,
                             role="assistant",
                             content_type="tool_call",
-                            content_text=truncate(json.dumps(args), 500),
-                            content_json=json.dumps({
+                            content_text=truncate(args_json, 500),
+                            content_json=jsonutil.dumps({
                                 "name": tool_name,
-                                "args": truncate(json.dumps(args), 1000),
+                                "args": truncate(args_json, 1000),
                                 "status": tc.get("status"),
                             }),
                             tool_name=tool_name,
@@ -169,7 +184,7 @@ class GeminiParser(SessionParser):
                         ordinal += 1
 
                         # Tool result
-                        result_text = json.dumps(result) if not isinstance(result, str) else result
+                        result_text = jsonutil.dumps(result) if not isinstance(result, str) else result
                         messages.append(ParsedMessage(
                             ordinal=ordinal,
                             role="tool",
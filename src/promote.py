@@ -6,27 +6,30 @@ import json
 import logging
 import re
 import time
+from collections import Counter
 from typing import Any
 
+from src import jsonutil
 from src.db import MemoryDB
 
 logger = logging.getLogger(__name__)
 
 
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+# Jaccard similarity at which a new entry confirms an existing one
+SIMILARITY_THRESHOLD = 0.7
+
+
 def _normalize(text: str) -> set[str]:
     """Normalize text to a set of lowercase words for similarity comparison."""
-    return set(re.sub(r'[^\w\s]', '', text.lower()).split())
+    return set(_PUNCT_RE.sub('', text.lower()).split())
 
 
-def _word_similarity(a: str, b: str) -> float:
-    """Word-level Jaccard similarity between two strings."""
-    words_a = _normalize(a)
-    words_b = _normalize(b)
+def _jaccard(words_a: set[str], words_b: set[str]) -> float:
     if not words_a or not words_b:
         return 0.0
-    intersection = words_a & words_b
-    union = words_a | words_b
-    return len(intersection) / len(union)
+    return len(words_a & words_b) / len(words_a | words_b)
 
 
 PROMOTE_PROMPT = """You are analyzing multiple coding session summaries for the same project.
@@ -57,6 +60,49 @@ multiple sessions (not one-off observations). Types: pattern, preference, archit
 Only include entries with confidence >= 0.5. Return empty array [] if nothing is stable enough."""
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _parse_entries(text: str) -> Any:
+    """Parse the JSON array of entries from an LLM response.
+
+    Falls back to the first '[' at which a complete JSON value starts, so
+    prose or a code fence around the array is ignored.  raw_decode stops
+    at the array's matching ']', unlike a greedy '[...]' regex that runs
+    to the last ']' in the text.
+    """
+    try:
+        return jsonutil.loads(text)
+    except jsonutil.JSONDecodeError:
+        pass
+    start = text.find("[")
+    while start != -1:
+        try:
+            return _JSON_DECODER.raw_decode(text, start)[0]
+        except json.JSONDecodeError:
+            start = text.find("[", start + 1)
+    return None
+
+
+def _summarized_sessions(
+    db: MemoryDB, sessions: list[dict]
+) -> tuple[list[dict], list[str]]:
+    """Return the summarized ones among ``sessions`` and their prompt blocks."""
+    summaries_by_id = db.get_summaries_bulk([s["id"] for s in sessions])
+    summarized = []
+    summaries = []
+    for s in sessions:
+        summary = summaries_by_id.get(s["id"])
+        if summary:
+            summarized.append(s)
+            summaries.append(
+                f"Session {s['id']} ({s.get('title', 'untitled')}):\n"
+                f"{summary['summary_text']}\n"
+                f"Decisions: {summary.get('key_decisions', '[]')}\n"
+            )
+    return summarized, summaries
+
+
 def promote_project_knowledge(
     db: MemoryDB,
     project_path: str,
@@ -68,25 +114,16 @@ def promote_project_knowledge(
 
     # Get all summarized sessions for this project
     sessions = db.list_sessions(project_path=project_path, limit=100)
-    summaries = []
-    for s in sessions:
-        summary = db.get_summary(s["id"])
-        if summary:
-            summaries.append(
-                f"Session {s['id']} ({s.get('title', 'untitled')}):\n"
-                f"{summary['summary_text']}\n"
-                f"Decisions: {summary.get('key_decisions', '[]')}\n"
-            )
+    summarized, summaries = _summarized_sessions(db, sessions)
 
     if len(summaries) < 2:
         return {"entries": [], "confirmed": 0, "new": 0}
 
     # Determine the dominant source for this project's sessions
-    source_counts: dict[str, int] = {}
-    for s in sessions:
-        src = s.get("source", "claude_code")
-        source_counts[src] = source_counts.get(src, 0) + 1
-    dominant_source = max(source_counts, key=source_counts.get)
+    # Ties go to the source seen first, as with max() over the counts
+    dominant_source = Counter(
+        s.get("source", "claude_code") for s in sessions
+    ).most_common(1)[0][0]
 
     existing = db.get_project_knowledge(project_path)
     existing_text = "\n".join(
@@ -102,65 +139,11 @@ def promote_project_knowledge(
 
     text = call_llm(prompt, source=dominant_source, model=model, backend=backend)
 
-    try:
-        entries = json.loads(text)
-    except json.JSONDecodeError:
-        import re
-        match = re.search(r'\[.*\]', text, re.DOTALL)
-        if match:
-            entries = json.loads(match.group(0))
-        else:
-            return {"entries": [], "confirmed": 0, "new": 0}
-
-    if not isinstance(entries, list):
+    entries = _parse_entries(text)
+    if entries is None:
         return {"entries": [], "confirmed": 0, "new": 0}
 
-    now = int(time.time())
-    session_ids = [s["id"] for s in sessions if db.get_summary(s["id"])]
-    existing_entries = db.get_project_knowledge(project_path)
-    result_entries = []
-    confirmed = 0
-    new = 0
-
-    for entry in entries:
-        if not isinstance(entry, dict):
-            continue
-        confidence = entry.get("confidence", 0.5)
-        if confidence < 0.5:
-            continue
-
-        content = entry.get("content", "")
-        ktype = entry.get("knowledge_type", "pattern")
-
-        # Check for similar existing entry (fuzzy match)
-        matched = None
-        for ex in existing_entries:
-            if _word_similarity(content, ex["content"]) >= 0.7:
-                matched = ex
-                break
-
-        if matched:
-            # Confirm existing entry — bump evidence_count, update confidence
-            db.confirm_knowledge(matched["id"], confidence=confidence)
-            result_entries.append(matched)
-            confirmed += 1
-        else:
-            # Insert new entry
-            knowledge = {
-                "project_path": project_path,
-                "knowledge_type": ktype,
-                "content": content,
-                "confidence": confidence,
-                "evidence_count": 1,
-                "source_sessions": json.dumps(session_ids[:10]),
-                "first_seen_at": now,
-                "last_confirmed_at": now,
-            }
-            db.upsert_project_knowledge(knowledge)
-            result_entries.append(knowledge)
-            new += 1
-
-    return {"entries": result_entries, "confirmed": confirmed, "new": new}
+    return _process_knowledge_entries(db, entries, project_path, summarized)
 
 
 def _process_knowledge_entries(
@@ -169,13 +152,20 @@ def _process_knowledge_entries(
     project_path: str,
     sessions: list[dict],
 ) -> dict:
-    """Shared logic: deduplicate and persist knowledge entries."""
+    """Shared logic: deduplicate and persist knowledge entries.
+
+    ``sessions`` are the summarized sessions the entries were drawn from.
+    """
     if not isinstance(entries, list):
         return {"entries": [], "confirmed": 0, "new": 0}
 
     now = int(time.time())
-    session_ids = [s["id"] for s in sessions if db.get_summary(s["id"])]
+    session_ids = [s["id"] for s in sessions]
     existing_entries = db.get_project_knowledge(project_path)
+    # Tokenize each existing entry once, not once per new entry
+    existing_words = [(ex, _normalize(ex["content"])) for ex in existing_entries]
+    source_sessions = jsonutil.dumps(session_ids[:10])
+    new_entries = []
     result_entries = []
     confirmed = 0
     new = 0
@@ -190,9 +180,11 @@ def _process_knowledge_entries(
         content = entry.get("content", "")
         ktype = entry.get("knowledge_type", "pattern")
 
+        # Check for similar existing entry (fuzzy match)
+        words = _normalize(content)
         matched = None
-        for ex in existing_entries:
-            if _word_similarity(content, ex["content"]) >= 0.7:
+        for ex, ex_words in existing_words:
+            if _jaccard(words, ex_words) >= SIMILARITY_THRESHOLD:
                 matched = ex
                 break
 
@@ -207,14 +199,17 @@ def _process_knowledge_entries(
                 "content": content,
                 "confidence": confidence,
                 "evidence_count": 1,
-                "source_sessions": json.dumps(session_ids[:10]),
+                "source_sessions": source_sessions,
                 "first_seen_at": now,
                 "last_confirmed_at": now,
             }
-            db.upsert_project_knowledge(knowledge)
+            new_entries.append(knowledge)
             result_entries.append(knowledge)
             new += 1
 
+    # New entries are only matched against pre-existing ones, so they can
+    # be written together once the loop is done
+    db.upsert_project_knowledge_many(new_entries)
     return {"entries": result_entries, "confirmed": confirmed, "new": new}
 
 
@@ -227,15 +222,7 @@ async def promote_project_knowledge_anthropic(
     from src.llm import call_claude_full
 
     sessions = db.list_sessions(project_path=project_path, limit=100)
-    summaries = []
-    for s in sessions:
-        summary = db.get_summary(s["id"])
-        if summary:
-            summaries.append(
-                f"Session {s['id']} ({s.get('title', 'untitled')}):\n"
-                f"{summary['summary_text']}\n"
-                f"Decisions: {summary.get('key_decisions', '[]')}\n"
-            )
+    summarized, summaries = _summarized_sessions(db, sessions)
 
     if len(summaries) < 2:
         return {"entries": [], "confirmed": 0, "new": 0}
@@ -252,21 +239,13 @@ async def promote_project_knowledge_anthropic(
         existing=existing_text,
     )
 
-    response = call_claude_full(prompt, model=model or "haiku")
+    response = call_claude_full(prompt, model=model or "haiku", lite=True)
 
-    try:
-        entries = json.loads(response.text)
-    except json.JSONDecodeError:
-        match = re.search(r'\[.*\]', response.text, re.DOTALL)
-        if match:
-            try:
-                entries = json.loads(match.group(0))
-            except json.JSONDecodeError:
-                return {"entries": [], "confirmed": 0, "new": 0}
-        else:
-            return {"entries": [], "confirmed": 0, "new": 0}
+    entries = _parse_entries(response.text)
+    if entries is None:
+        return {"entries": [], "confirmed": 0, "new": 0}
 
-    return _process_knowledge_entries(db, entries, project_path, sessions)
+    return _process_knowledge_entries(db, entries, project_path, summarized)
 
 
 def select_l1_context(db: MemoryDB, project_path: str, budget_tokens: int = 2000) -> str:
@@ -282,12 +261,13 @@ def select_l1_context(db: MemoryDB, project_path: str, budget_tokens: int = 2000
     estimated_tokens = 10  # header
 
     for entry in entries:
-        line = f"- **[{entry['knowledge_type']}]** {entry['content']}"
-        # Rough estimate: 1 token ~= 4 chars
-        line_tokens = len(line) // 4
+        ktype, content = entry["knowledge_type"], entry["content"]
+        # Rough estimate: 1 token ~= 4 chars.  The line is 9 chars of markup
+        # plus both fields, so it is only formatted once it fits.
+        line_tokens = (9 + len(ktype) + len(content)) // 4
         if estimated_tokens + line_tokens > budget_tokens:
             break
-        lines.append(line)
+        lines.append(f"- **[{ktype}]** {content}")
         estimated_tokens += line_tokens
 
     return "\n".join(lines)
@@ -10,7 +10,7 @@ from typing import Any
 from src.db import MemoryDB
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResult:
     session_id: str
     score: float
@@ -34,27 +34,43 @@ class SearchResult:
         }
 
 
-def recency_score(epoch: int, half_life_days: float = 30.0) -> float:
-    """Exponential decay score based on age. Half-life of 30 days."""
-    now = time.time()
-    age_days = (now - epoch) / 86400
-    if age_days < 0:
-        age_days = 0
-    return math.pow(2, -age_days / half_life_days)
+_LN2 = math.log(2)
+
+
+def recency_score(
+    epoch: int, half_life_days: float = 30.0, now: float | None = None
+) -> float:
+    """Exponential decay score based on age. Half-life of 30 days.
+
+    Pass ``now`` when scoring many sessions to avoid a clock read per call.
+    """
+    if now is None:
+        now = time.time()
+    age_seconds = now - epoch
+    if age_seconds <= 0:
+        return 1.0
+    return math.exp(-_LN2 * age_seconds / (86400 * half_life_days))
 
 
 def importance_score(session: dict) -> float:
-    """Score session importance based on message count, tokens, etc."""
+    """Score session importance based on message count, tokens, etc.
+
+    Stored rows carry this precomputed in ``sessions.importance`` (see
+    ``src.db.IMPORTANCE_SQL``); keep the two formulas in sync.
+    """
     msg_count = session.get("message_count", 0)
     user_msgs = session.get("user_message_count", 0)
     tokens = session.get("total_tokens", 0)
     compactions = session.get("compaction_count", 0)
 
-    # Normalize each factor to 0-1 range
-    msg_factor = min(msg_count / 100, 1.0)
-    user_factor = min(user_msgs / 20, 1.0)
-    token_factor = min(tokens / 200000, 1.0)
-    compaction_factor = min(compactions / 5, 1.0)
+    if not (msg_count or user_msgs or tokens or compactions):
+        return 0.0
+
+    # Normalize each factor to 0-1 range (saturated factors skip the divide)
+    msg_factor = 1.0 if msg_count >= 100 else msg_count / 100
+    user_factor = 1.0 if user_msgs >= 20 else user_msgs / 20
+    token_factor = 1.0 if tokens >= 200000 else tokens / 200000
+    compaction_factor = 1.0 if compactions >= 5 else compactions / 5
 
     return (msg_factor * 0.3 + user_factor * 0.3 +
             token_factor * 0.2 + compaction_factor * 0.2)
@@ -73,46 +89,49 @@ def hybrid_search(
     (Without vector search, FTS gets higher weight)
     """
     # Step 1: FTS search for matching messages
-    fts_results = db.search_fts(query, limit=50)
+    fts_results = db.search_fts(
+        query, limit=50, project_path=project_path, after=after
+    )
 
-    # Group by session, tracking best FTS score per session
-    session_fts: dict[str, dict] = {}
+    # Group by session, tracking best FTS score per session as
+    # (rank, snippet), and the best overall for normalization
+    session_fts: dict[str, tuple[float, str]] = {}
+    max_rank = 0.0
     for row in fts_results:
         sid = row["session_id"]
         rank = abs(row.get("rank", 0))  # BM25 returns negative scores
-        if sid not in session_fts or rank > session_fts[sid]["rank"]:
-            session_fts[sid] = {
-                "rank": rank,
-                "snippet": (row.get("content_text", "") or "")[:200],
-            }
+        best = session_fts.get(sid)
+        if best is None or rank > best[0]:
+            session_fts[sid] = (rank, row["snippet"] or "")
+            if rank > max_rank:
+                max_rank = rank
 
     if not session_fts:
         return []
 
     # Normalize FTS scores to 0-1
-    max_rank = max(s["rank"] for s in session_fts.values()) or 1.0
+    max_rank = max_rank or 1.0
 
     # Step 2: Build results with combined scoring
+    now = time.time()
+    sessions = db.get_sessions_bulk(list(session_fts))
+    summaries = db.get_summaries_bulk(list(sessions))
     results: list[SearchResult] = []
-    for sid, fts_data in session_fts.items():
-        session = db.get_session(sid)
+    for sid, (rank, snippet) in session_fts.items():
+        session = sessions.get(sid)
         if not session:
             continue
 
-        # Apply filters
-        if project_path and session.get("project_path") != project_path:
-            continue
-        if after and session.get("first_message_at", 0) < after:
-            continue
-
-        fts_norm = fts_data["rank"] / max_rank
-        rec = recency_score(session.get("first_message_at", 0))
-        imp = importance_score(session)
+        fts_norm = rank / max_rank
+        rec = recency_score(session.get("first_message_at", 0), now=now)
+        imp = session.get("importance")
+        if imp is None:
+            imp = importance_score(session)
 
         final_score = fts_norm * 0.5 + rec * 0.25 + imp * 0.25
 
         # Get summary if available
-        summary = db.get_summary(sid)
+        summary = summaries.get(sid)
         summary_text = summary["summary_text"] if summary else None
 
         results.append(SearchResult(
@@ -123,7 +142,7 @@ def hybrid_search(
             title=session.get("title"),
             summary=summary_text,
             first_message_at=session.get("first_message_at", 0),
-            matching_snippets=[fts_data["snippet"]],
+            matching_snippets=[snippet],
         ))
 
     # Sort by score descending
@@ -146,9 +165,10 @@ def timeline_search(
         limit=limit,
     )
 
+    summaries = db.get_summaries_bulk([s["id"] for s in sessions])
     results = []
     for s in sessions:
-        summary = db.get_summary(s["id"])
+        summary = summaries.get(s["id"])
         results.append({
             "session_id": s["id"],
             "source": s["source"],
@@ -2,15 +2,19 @@
 
 from __future__ import annotations
 
-import json
 import logging
+import re
 import time
 from typing import Any
 
+from src import jsonutil
 from src.db import MemoryDB
 
 logger = logging.getLogger(__name__)
 
+# Fallbacks for responses that are not bare JSON, most specific first
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+_JSON_BRACE_RE = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
 
 SUMMARIZE_PROMPT = """You are analyzing a CLI coding session transcript. Generate a structured summary.
 
@@ -32,18 +36,35 @@ Respond with a JSON object (no markdown, just raw JSON):
 }}"""
 
 
+# Messages kept from the end of a conversation that exceeds max_messages
+TAIL_MESSAGES = 30
+
+
 def format_conversation(messages: list[dict], max_messages: int = 200) -> str:
     """Format messages into a readable conversation string."""
-    lines = []
-    count = 0
-    for msg in messages:
-        if count >= max_messages:
-            lines.append(f"... ({len(messages) - count} more messages)")
-            break
-        role = msg.get("role", "?")
-        ctype = msg.get("content_type", "text")
-        text = msg.get("content_text", "")
+    return format_conversation_rows(
+        [
+            (
+                msg.get("role", "?"),
+                msg.get("content_type", "text"),
+                msg.get("content_text", ""),
+                msg.get("tool_name", "unknown"),
+            )
+            for msg in messages
+        ],
+        max_messages,
+    )
 
+
+def format_conversation_rows(rows: list[tuple], max_messages: int = 200) -> str:
+    """Format (role, content_type, content_text, tool_name) rows, as returned
+    by MemoryDB.get_conversation_rows, into a readable conversation string.
+
+    Sessions with more than ``max_messages`` usable messages keep their
+    opening and their last TAIL_MESSAGES messages; the middle is dropped.
+    """
+    lines = []
+    for role, ctype, text, tool in rows:
         if not text or not text.strip():
             continue
 
@@ -51,14 +72,18 @@ def format_conversation(messages: list[dict], max_messages: int = 200) -> str:
             continue  # skip thinking blocks for summary
 
         if ctype == "tool_call":
-            tool = msg.get("tool_name", "unknown")
             lines.append(f"[{role} → {tool}]: {text[:300]}")
         elif ctype == "tool_result":
             lines.append(f"[tool result]: {text[:200]}")
         else:
             lines.append(f"[{role}]: {text[:500]}")
 
-        count += 1
+    if len(lines) > max_messages:
+        # The end of a session carries its outcome, so keep it too
+        tail = min(TAIL_MESSAGES, max_messages // 4)
+        head = max_messages - tail
+        omitted = f"... ({len(lines) - max_messages} more messages)"
+        lines = lines[:head] + [omitted] + (lines[-tail:] if tail else [])
 
     return "\n".join(lines)
 
@@ -66,23 +91,22 @@ def format_conversation(messages: list[dict], max_messages: int = 200) -> str:
 def _parse_json_response(text: str) -> dict | None:
     """Parse JSON from LLM response, handling markdown code blocks."""
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        return jsonutil.loads(text)
+    except jsonutil.JSONDecodeError:
         pass
     # Try extracting from markdown code block
-    import re
-    match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
+    match = _JSON_FENCE_RE.search(text)
     if match:
         try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError:
+            return jsonutil.loads(match.group(1))
+        except jsonutil.JSONDecodeError:
             pass
     # Try finding first { ... } block
-    match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
+    match = _JSON_BRACE_RE.search(text)
     if match:
         try:
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
+            return jsonutil.loads(match.group(0))
+        except jsonutil.JSONDecodeError:
             pass
     return None
 
@@ -100,11 +124,11 @@ def summarize_session(
     if not session:
         return None
 
-    messages = db.get_session_messages(session_id)
-    if not messages:
+    rows = db.get_conversation_rows(session_id)
+    if not rows:
         return None
 
-    conversation = format_conversation(messages)
+    conversation = format_conversation_rows(rows)
     if len(conversation) < 100:
         return None
 
@@ -126,9 +150,9 @@ def summarize_session(
     summary = {
         "session_id": session_id,
         "summary_text": data.get("summary_text", ""),
-        "key_decisions": json.dumps(data.get("key_decisions", [])),
-        "files_touched": json.dumps(data.get("files_touched", [])),
-        "commands_run": json.dumps(data.get("commands_run", [])),
+        "key_decisions": jsonutil.dumps(data.get("key_decisions", [])),
+        "files_touched": jsonutil.dumps(data.get("files_touched", [])),
+        "commands_run": jsonutil.dumps(data.get("commands_run", [])),
         "outcome": data.get("outcome", "unknown"),
         "generated_at": int(time.time()),
         "generator_model": model or "default",
@@ -150,11 +174,11 @@ async def summarize_session_anthropic(
     if not session:
         return None
 
-    messages = db.get_session_messages(session_id)
-    if not messages:
+    rows = db.get_conversation_rows(session_id)
+    if not rows:
         return None
 
-    conversation = format_conversation(messages)
+    conversation = format_conversation_rows(rows)
     if len(conversation) < 100:
         return None
 
@@ -168,7 +192,7 @@ async def summarize_session_anthropic(
         conversation=conversation,
     )
 
-    response = call_claude_full(prompt, model=model or "haiku")
+    response = call_claude_full(prompt, model=model or "haiku", lite=True)
     data = _parse_json_response(response.text)
     if not data:
         logger.warning(f"Failed to parse JSON from Claude response for session {session_id}")
@@ -177,14 +201,14 @@ async def summarize_session_anthropic(
     summary = {
         "session_id": session_id,
         "summary_text": data.get("summary_text", ""),
-        "key_decisions": json.dumps(data.get("key_decisions", [])),
-        "files_touched": json.dumps(data.get("files_touched", [])),
-        "commands_run": json.dumps(data.get("commands_run", [])),
+        "key_decisions": jsonutil.dumps(data.get("key_decisions", [])),
+        "files_touched": jsonutil.dumps(data.get("files_touched", [])),
+        "commands_run": jsonutil.dumps(data.get("commands_run", [])),
         "outcome": data.get("outcome", "unknown"),
         "generated_at": int(time.time()),
         "generator_model": model or "haiku",
-        "thinking": json.dumps(response.thinking) if response.thinking else None,
-        "usage": json.dumps(response.usage) if response.usage else None,
+        "thinking": jsonutil.dumps(response.thinking) if response.thinking else None,
+        "usage": jsonutil.dumps(response.usage) if response.usage else None,
         "claude_session_id": response.session_id,
     }
 
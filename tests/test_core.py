@@ -1,6 +1,9 @@
 """Core tests for tactical memory system."""
 
 import json
+import os
+import shutil
+import sqlite3
 import tempfile
 import time
 from pathlib import Path
@@ -9,19 +12,42 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 from src.db import MemoryDB
-from src.entities import extract_entities, extract_entities_for_session
-from src.llm import _resolve_backend, call_llm, DEFAULT_MODELS, SOURCE_TO_BACKEND
+from src.entities import (
+    extract_entities,
+    extract_entities_for_session,
+    extract_entities_for_sessions,
+    scan_session,
+)
+from src.llm import _resolve_backend, _which, call_llm, DEFAULT_MODELS, SOURCE_TO_BACKEND
 from src.parsers.base import iso_to_epoch, truncate, infer_project_from_cwd
 from src.search import hybrid_search, recency_score, importance_score
 
 
+@pytest.fixture(autouse=True)
+def _clear_which_cache():
+    """shutil.which results are memoized; keep tests' patches isolated."""
+    _which.cache_clear()
+    yield
+    _which.cache_clear()
+
+
+@pytest.fixture(scope="session")
+def _template_db(tmp_path_factory):
+    """An initialized, empty database file, built once per test run."""
+    db_path = tmp_path_factory.mktemp("template") / "template.sqlite"
+    db = MemoryDB(db_path)
+    db.initialize()
+    db.close()  # checkpoints the WAL, so the file alone is complete
+    return db_path
+
+
 @pytest.fixture
-def db():
-    """Create a temporary in-memory-like database."""
+def db(_template_db):
+    """Create a temporary database from a copy of the empty template."""
     with tempfile.TemporaryDirectory() as tmpdir:
         db_path = Path(tmpdir) / "test.sqlite"
+        shutil.copyfile(_template_db, db_path)
         db = MemoryDB(db_path)
-        db.initialize()
         yield db
         db.close()
 
@@ -98,12 +124,83 @@ class TestDB:
         assert stats["total_sessions"] == 0
         assert stats["total_messages"] == 0
 
+    def test_migrate_from_v1(self, db):
+        # Roll the fresh schema back to its v1 shape
+        db.conn.executescript("""
+            ALTER TABLE entity_occurrences DROP COLUMN ctx_start;
+            ALTER TABLE entity_occurrences DROP COLUMN ctx_end;
+            ALTER TABLE sessions DROP COLUMN importance;
+            ALTER TABLE parse_cache DROP COLUMN parsed_offset;
+            CREATE INDEX idx_messages_session ON messages(session_id);
+            DROP INDEX idx_sessions_l3_pending;
+            CREATE INDEX idx_sessions_l3_pending
+                ON sessions(user_message_count, first_message_at DESC) WHERE tier = 'L3';
+            UPDATE schema_meta SET value = '1' WHERE key = 'version';
+        """)
+        db.initialize()
+        version = db.conn.execute(
+            "SELECT value FROM schema_meta WHERE key = 'version'"
+        ).fetchone()[0]
+        assert int(version) >= 2
+        trigger_sql = db.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'messages_au'"
+        ).fetchone()[0]
+        assert "UPDATE OF content_text" in trigger_sql
+        columns = {r[1] for r in db.conn.execute("PRAGMA table_info(entity_occurrences)")}
+        assert {"ctx_start", "ctx_end"} <= columns
+        columns = {r[1] for r in db.conn.execute("PRAGMA table_info(sessions)")}
+        assert "importance" in columns
+        columns = {r[1] for r in db.conn.execute("PRAGMA table_info(parse_cache)")}
+        assert "parsed_offset" in columns
+        indexes = {r[1] for r in db.conn.execute("PRAGMA index_list(messages)")}
+        assert "idx_messages_session" not in indexes
+        pending = [r[2] for r in db.conn.execute("PRAGMA index_info(idx_sessions_l3_pending)")]
+        assert pending == ["first_message_at"]
+
+    def test_migration_step_is_atomic(self, db, monkeypatch):
+        from src import db as db_module
+
+        db.conn.executescript("""
+            ALTER TABLE entity_occurrences DROP COLUMN ctx_start;
+            ALTER TABLE entity_occurrences DROP COLUMN ctx_end;
+            ALTER TABLE sessions DROP COLUMN importance;
+            UPDATE schema_meta SET value = '2' WHERE key = 'version';
+        """)
+        # Fails after its first statement has run
+        monkeypatch.setitem(
+            db_module.MIGRATIONS, 3,
+            db_module.MIGRATIONS[3] + "SELECT * FROM no_such_table;",
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            db.initialize()
+        assert not db.conn.in_transaction
+        columns = {r[1] for r in db.conn.execute("PRAGMA table_info(entity_occurrences)")}
+        assert "ctx_start" not in columns
+        version = db.conn.execute(
+            "SELECT value FROM schema_meta WHERE key = 'version'"
+        ).fetchone()[0]
+        assert version == "2"
+
+        # The step re-runs cleanly once fixed
+        monkeypatch.undo()
+        db.initialize()
+        columns = {r[1] for r in db.conn.execute("PRAGMA table_info(entity_occurrences)")}
+        assert {"ctx_start", "ctx_end"} <= columns
+
     def test_upsert_session(self, db_with_data):
         session = db_with_data.get_session("test-session-1")
         assert session is not None
         assert session["source"] == "codex"
         assert session["project_name"] == "myproject"
 
+    def test_get_sessions_bulk(self, db_with_data):
+        found = db_with_data.get_sessions_bulk(["test-session-1", "missing"])
+        assert list(found) == ["test-session-1"]
+        assert found["test-session-1"]["source"] == "codex"
+        session = found["test-session-1"]
+        assert session["importance"] == pytest.approx(importance_score(session))
+        assert db_with_data.get_summaries_bulk(["test-session-1"]) == {}
+
     def test_session_exists(self, db_with_data):
         assert db_with_data.session_exists("test-session-1")
         assert not db_with_data.session_exists("nonexistent")
@@ -114,6 +211,67 @@ class TestDB:
         assert messages[0]["role"] == "user"
         assert messages[1]["role"] == "assistant"
 
+    def test_get_conversation_rows(self, db_with_data):
+        from src.summarize import format_conversation, format_conversation_rows
+
+        rows = db_with_data.get_conversation_rows("test-session-1")
+        messages = db_with_data.get_session_messages("test-session-1")
+        assert [tuple(r) for r in rows] == [
+            (m["role"], m["content_type"], m["content_text"], m["tool_name"])
+            for m in messages
+        ]
+        for limit in (200, 1):
+            assert format_conversation_rows(rows, limit) == format_conversation(messages, limit)
+
+    def test_format_conversation_keeps_tail(self):
+        from src.summarize import format_conversation_rows
+
+        rows = [("user", "text", f"m{i}", None) for i in range(300)]
+        rows.insert(5, ("assistant", "thinking", "hidden", None))
+        lines = format_conversation_rows(rows, 200).splitlines()
+        assert len(lines) == 201
+        assert lines[0] == "[user]: m0" and lines[169] == "[user]: m169"
+        assert lines[170] == "... (100 more messages)"
+        assert lines[171] == "[user]: m270" and lines[-1] == "[user]: m299"
+        assert format_conversation_rows(rows, 1).splitlines() == ["[user]: m0", "... (299 more messages)"]
+
+    def test_insert_messages_via_scratch(self, db_with_data):
+        msgs = db_with_data.get_session_messages("test-session-1")
+        extra = [dict(m, ordinal=m["ordinal"] + 10) for m in msgs]
+        for m in extra:
+            del m["id"]
+        with patch.object(MemoryDB, "SCRATCH_INGEST_MIN_ROWS", 1):
+            db_with_data.insert_messages(extra)
+        messages = db_with_data.get_session_messages("test-session-1")
+        assert [m["ordinal"] for m in messages] == [0, 1, 2, 10, 11, 12]
+        assert len(db_with_data.search_fts("netplan")) == 6
+
+    def test_ingest_via_scratch_transactions(self, db_with_data):
+        db = db_with_data
+        msgs = db.get_session_messages("test-session-1")
+        extra = [dict(m, ordinal=m["ordinal"] + 10) for m in msgs]
+        for m in extra:
+            del m["id"]
+        attached = lambda: [r[1] for r in db.conn.execute("PRAGMA database_list")]
+
+        # A failing batch is rolled back, not half-committed, and detached
+        broken = extra[:2] + [{"session_id": "test-session-1"}]
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.ingest_via_scratch(broken)
+        assert len(db.get_session_messages("test-session-1")) == 3
+        assert "scratch" not in attached() and not db.conn.in_transaction
+
+        # Inside an open transaction it inserts directly, without ATTACH
+        db.conn.execute("UPDATE sessions SET title = 'x' WHERE id = 'test-session-1'")
+        assert db.conn.in_transaction
+        statements = []
+        db.conn.set_trace_callback(statements.append)
+        with patch.object(MemoryDB, "SCRATCH_INGEST_MIN_ROWS", 1):
+            db.insert_messages(extra)
+        db.conn.set_trace_callback(None)
+        assert not any("ATTACH" in sql for sql in statements)
+        assert len(db.get_session_messages("test-session-1")) == 6
+
     def test_list_sessions(self, db_with_data):
         sessions = db_with_data.list_sessions()
         assert len(sessions) == 1
@@ -126,6 +284,21 @@ class TestDB:
         results = db_with_data.search_fts("netplan permissions")
         assert len(results) > 0
         assert any("netplan" in r.get("content_text", "") for r in results)
+        assert all("netplan" in r["snippet"] for r in results)
+
+    def test_optimize_keeps_fts_results(self, db_with_data):
+        before = [r["id"] for r in db_with_data.search_fts("netplan")]
+        db_with_data.optimize()
+        assert [r["id"] for r in db_with_data.search_fts("netplan")] == before
+        # Raises if the merged index no longer matches the messages table
+        db_with_data.conn.execute(
+            "INSERT INTO messages_fts(messages_fts, rank) VALUES('integrity-check', 1)"
+        )
+
+    def test_escape_fts5_drops_short_tokens(self):
+        assert MemoryDB._escape_fts5("a netplan") == '"netplan"'
+        assert MemoryDB._escape_fts5("a") == '"a"'
+        assert MemoryDB._escape_fts5('o3-mini "x"') == '"o3-mini" """x"""'
 
     def test_upsert_summary(self, db_with_data):
         db_with_data.upsert_summary({
@@ -146,6 +319,45 @@ class TestDB:
         session = db_with_data.get_session("test-session-1")
         assert session["tier"] == "L2"
 
+    def test_get_unsummarized_sessions(self, db_with_data):
+        assert [s["id"] for s in db_with_data.get_unsummarized_sessions()] == ["test-session-1"]
+        db_with_data.upsert_summary({
+            "session_id": "test-session-1",
+            "summary_text": "done",
+            "key_decisions": None,
+            "files_touched": None,
+            "commands_run": None,
+            "outcome": "completed",
+            "generated_at": int(time.time()),
+            "generator_model": "test",
+        })
+        assert db_with_data.get_unsummarized_sessions() == []
+        db_with_data.delete_summary("test-session-1")
+        assert len(db_with_data.get_unsummarized_sessions()) == 1
+
+    def test_unsummarized_sessions_plan(self, db_with_data):
+        # The partial index serves both the tier filter and the ORDER BY,
+        # with or without ANALYZE stats
+        sql = (
+            "EXPLAIN QUERY PLAN SELECT * FROM sessions "
+            "WHERE tier = 'L3' AND user_message_count >= ? ORDER BY first_message_at DESC"
+        )
+        for _ in range(2):
+            plan = " ".join(r[3] for r in db_with_data.conn.execute(sql, (3,)))
+            assert "idx_sessions_l3_pending" in plan
+            assert "TEMP B-TREE" not in plan
+            db_with_data.conn.execute("ANALYZE")
+
+    def test_upsert_entities_batch(self, db):
+        ids = db.upsert_entities([("function", "foo", 10, 20, 2), ("package", "bar", 5, 5, 1)])
+        again = db.upsert_entities([("function", "foo", 30, 30, 1)])
+        assert again[("function", "foo")] == ids[("function", "foo")]
+        row = db.conn.execute(
+            "SELECT first_seen_at, last_seen_at, occurrence_count FROM entities "
+            "WHERE canonical_value = 'foo'"
+        ).fetchone()
+        assert tuple(row) == (10, 30, 3)
+
     def test_job_queue(self, db):
         job_id = db.enqueue_job("extract_entities", "session", "test-1")
         assert job_id > 0
@@ -153,8 +365,9 @@ class TestDB:
         job = db.claim_job()
         assert job is not None
         assert job["job_type"] == "extract_entities"
-        # claim_job returns the row before update; verify it was claimed
         assert job["id"] == job_id
+        assert job["status"] == "running" and job["started_at"]
+        assert db.claim_job() is None  # already claimed
 
         db.finish_job(job["id"])
         # No more jobs
@@ -190,6 +403,60 @@ class TestEntities:
         stats = db_with_data.stats()
         assert stats["total_entities"] > 0
 
+    def test_extract_entities_for_sessions_parallel(self, db_with_data):
+        expected = scan_session(db_with_data.db_path, "test-session-1")
+        assert expected
+        with patch("src.entities.PARALLEL_SCAN_MIN_SESSIONS", 1):
+            count = extract_entities_for_sessions(
+                db_with_data, ["test-session-1"], max_workers=2
+            )
+        assert count == len(expected)
+        assert db_with_data.stats()["total_entities"] > 0
+
+    def test_extract_entities_for_sessions_worker_failure(self, db_with_data):
+        from concurrent.futures import Future
+
+        class LockedPool:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_exception(sqlite3.OperationalError("database is locked"))
+                return future
+
+        expected = scan_session(db_with_data.db_path, "test-session-1")
+        with patch("src.entities.PARALLEL_SCAN_MIN_SESSIONS", 1), \
+                patch("src.entities.ProcessPoolExecutor", LockedPool):
+            count = extract_entities_for_sessions(
+                db_with_data, ["test-session-1"], max_workers=2
+            )
+        assert count == len(expected)
+
+    def test_scan_session_escapes_path(self, db_with_data):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            odd = Path(tmpdir) / "a?b#c%20d.sqlite"
+            db_with_data.conn.execute("VACUUM INTO ?", (str(odd),))
+            assert scan_session(odd, "test-session-1") == scan_session(
+                db_with_data.db_path, "test-session-1"
+            )
+
+    def test_snippet_for(self, db_with_data):
+        extract_entities_for_session(db_with_data, "test-session-1")
+        entity_id, message_id = db_with_data.conn.execute(
+            """SELECT o.entity_id, o.message_id FROM entity_occurrences o
+            JOIN entities e ON e.id = o.entity_id
+            WHERE e.canonical_value = '/etc/netplan/config.yaml'"""
+        ).fetchone()
+        snippet = db_with_data.snippet_for(entity_id, message_id)
+        assert "/etc/netplan/config.yaml" in snippet
+
 
 class TestGeminiParser:
     """Tests for the Gemini CLI session parser."""
@@ -274,6 +541,68 @@ class TestGeminiParser:
             assert session.last_message_at >= session.first_message_at
             assert session.title == "search the latest nba score"
 
+    def test_trusted_folders_cached_until_changed(self, tmp_path, monkeypatch):
+        import hashlib
+        from src.parsers import gemini
+
+        monkeypatch.setenv("HOME", str(tmp_path))
+        monkeypatch.setattr(gemini, "_trusted_folders_cache", None)
+        tf = tmp_path / ".gemini" / "trustedFolders.json"
+        tf.parent.mkdir()
+        tf.write_text(json.dumps({"/a": "TRUST_FOLDER"}))
+
+        first = gemini._load_trusted_folders()
+        assert first == {hashlib.sha256(b"/a").hexdigest(): "/a"}
+        with patch.object(Path, "read_text", side_effect=AssertionError("re-read")):
+            assert gemini._load_trusted_folders() is first
+
+        tf.write_text(json.dumps({"/a": "TRUST_FOLDER", "/b": "TRUST_FOLDER"}))
+        assert len(gemini._load_trusted_folders()) == 2
+
+    def test_parse_all_process_pool(self):
+        from src.parsers.gemini import GeminiParser
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base = self._make_session_json(Path(tmpdir))
+            missing = Path(tmpdir) / "missing.json"
+            parser = GeminiParser()
+            files = parser.discover_files([base]) + [missing]
+            with patch("src.parsers.base.PARALLEL_PARSE_MIN_FILES", 1):
+                results = list(parser.parse_all(files, max_workers=2))
+
+            assert len(results) == 2
+            session, error = results[0]
+            assert error is None
+            assert session.id == parser.parse(files[0]).id
+            assert results[1][0] is None
+
+            # Any pool failure falls back to parsing in-process
+            with patch("src.parsers.base.PARALLEL_PARSE_MIN_FILES", 1), \
+                    patch("src.parsers.base.ProcessPoolExecutor", side_effect=RuntimeError):
+                serial = list(parser.parse_all(files, max_workers=2))
+            assert [s.id if s else None for s, _ in serial] == [session.id, None]
+
+    def test_ingest_skips_unchanged_files(self, db):
+        from src.cli import _run_ingest
+        from src.config import Config
+        from src.parsers.gemini import GeminiParser
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base = self._make_session_json(Path(tmpdir))
+            config = Config(
+                codex_enabled=False, claude_code_enabled=False, gemini_paths=[base]
+            )
+            with patch("src.cli.default_config", return_value=config):
+                first = _run_ingest(db, verbose=False)
+                with patch.object(GeminiParser, "parse", side_effect=AssertionError):
+                    second = _run_ingest(db, verbose=False)
+                forced = _run_ingest(db, force=True, verbose=False)
+
+        assert first["sessions"] == 1
+        assert second["sessions"] == 0 and second["skipped"] == 1
+        assert forced["sessions"] == 1
+        assert len(db.get_parse_cache()) == 1
+
     def test_parse_messages(self):
         from src.parsers.gemini import GeminiParser
 
@@ -346,6 +675,104 @@ class TestParsers:
         assert ts > 0
         # Verify it's in the right ballpark (Nov 2025)
         assert 1730000000 < ts < 1770000000
+        assert iso_to_epoch("2025-11-20T23:43:13Z") == ts
+        assert iso_to_epoch("2025-11-20T23:43:13.218123+00:00") == ts
+        # Malformed values still return 0
+        assert iso_to_epoch("2025-13-20T23:43:13Z") == 0
+        assert iso_to_epoch("2025-11-20T23:43:13.1234567Z") == 0
+        assert iso_to_epoch("2025-02-29T10:00:00Z") == 0
+        assert iso_to_epoch("2025-11-20T24:00:00Z") == 0
+        # Same date, different time of day: offset from the cached midnight
+        assert iso_to_epoch("2025-11-21T00:00:00Z") - iso_to_epoch("2025-11-20T00:00:00Z") == 86400
+        assert iso_to_epoch("2025-11-20T23:43:14Z") == ts + 1
+
+    def test_read_jsonl_streams_and_skips_bad_lines(self, tmp_path):
+        from src.parsers.claude_code import ClaudeCodeParser
+
+        path = tmp_path / "s.jsonl"
+        path.write_bytes(b'{"a": 1}\n\nnot json\n{"b": "x\xff"}\n')
+        records = ClaudeCodeParser().read_jsonl(path)
+        assert not isinstance(records, list)
+        assert list(records) == [{"a": 1}, {"b": "x\ufffd"}]
+
+    def test_claude_parse_incremental(self, tmp_path):
+        from src.parsers.claude_code import ClaudeCodeParser
+
+        def record(rec_type, ts, content):
+            role = "user" if rec_type == "user" else "assistant"
+            return json.dumps({
+                "type": rec_type, "sessionId": "s1", "cwd": "/tmp/proj",
+                "timestamp": ts, "message": {"role": role, "content": content},
+            }) + "\n"
+
+        lines = [
+            record("user", "2025-11-20T10:00:00Z", "first question"),
+            record("assistant", "2025-11-20T10:00:05Z", "first answer"),
+            record("user", "2025-11-20T10:05:00Z", "second question"),
+            record("assistant", "2025-11-20T10:05:09Z", [
+                {"type": "tool_use", "id": "t1", "name": "Bash", "input": {}},
+            ]),
+        ]
+        path = tmp_path / "s1.jsonl"
+        parser = ClaudeCodeParser()
+        path.write_text("".join(lines[:2]))
+        before = parser.parse(path)
+        assert before.parsed_offset == path.stat().st_size
+
+        # A partial trailing line is left for the next parse
+        path.write_text("".join(lines) + '{"type": "us')
+        after = parser.parse_incremental(
+            path, before.parsed_offset, before.to_session_dict()
+        )
+        path.write_text("".join(lines))
+        full = parser.parse(path)
+
+        assert after.messages == full.messages[len(before.messages):]
+        assert after.messages[0].ordinal == 2
+        assert after.parsed_offset == full.parsed_offset == path.stat().st_size
+        got, want = after.to_session_dict(), full.to_session_dict()
+        got.pop("ingested_at"), want.pop("ingested_at")
+        assert got == want
+
+    def test_parse_incremental_default_is_full_parse(self, tmp_path):
+        from src.parsers.base import SessionParser
+
+        class Parser(SessionParser):
+            def parse(self, file_path):
+                return file_path.name
+
+            def discover_files(self, base_paths):
+                return []
+
+        path = tmp_path / "s.json"
+        assert Parser().parse_incremental(path, 10, {}) == "s.json"
+
+    def test_find_files(self, tmp_path):
+        from src.parsers.base import find_files
+
+        day = tmp_path / "2025" / "11" / "20"
+        day.mkdir(parents=True)
+        for name in ("rollout-b.jsonl", "rollout-a.jsonl", "other.jsonl", "rollout-c.json"):
+            (day / name).write_text("")
+        (tmp_path / "rollout-top.jsonl").write_text("")
+        (tmp_path / "rollout-dir.jsonl").mkdir()
+        (tmp_path / "link").symlink_to(day)
+
+        found = find_files(tmp_path, "rollout-", ".jsonl")
+        assert found == sorted(p for p in tmp_path.rglob("rollout-*.jsonl") if p.is_file())
+        assert [p.name for p in found] == ["rollout-a.jsonl", "rollout-b.jsonl", "rollout-top.jsonl"]
+
+    def test_jsonutil_roundtrip(self):
+        from src import jsonutil
+
+        obj = {"path": "/tmp/é.py", "n": [1, 2.5, None, True]}
+        text = jsonutil.dumps(obj)
+        assert text == json.dumps(obj)  # stored form matches baseline json.dumps
+        assert jsonutil.loads(text) == obj
+        assert jsonutil.loads(text.encode()) == obj
+        assert json.loads(jsonutil.dumps_pretty(obj)) == obj
+        with pytest.raises(jsonutil.JSONDecodeError):
+            jsonutil.loads("{not json")
 
     def test_truncate(self):
         assert truncate("short", 100) == "short"
@@ -362,6 +789,8 @@ class TestSearch:
         now = time.time()
         assert recency_score(int(now)) > 0.99  # just now
         assert recency_score(int(now - 30 * 86400)) == pytest.approx(0.5, abs=0.01)  # 30 days ago
+        assert recency_score(0, now=60 * 86400) == pytest.approx(0.25)
+        assert recency_score(100, now=50) == 1.0  # future timestamps clamp
 
     def test_importance_score(self):
         session = {
@@ -387,6 +816,179 @@ class TestSearch:
         assert len(results) > 0
         assert results[0].session_id == "test-session-1"
 
+    def test_hybrid_search_filters(self, db_with_data):
+        assert hybrid_search(db_with_data, "netplan", project_path="/other") == []
+        assert hybrid_search(db_with_data, "netplan", after=int(time.time()) + 3600) == []
+        results = hybrid_search(
+            db_with_data, "netplan", project_path="/Users/test/Code/myproject"
+        )
+        assert [r.session_id for r in results] == ["test-session-1"]
+
+    def test_mcp_search_result_cache(self, db_with_data, monkeypatch):
+        from src import mcp_server
+
+        monkeypatch.setattr(mcp_server, "_db", db_with_data)
+        monkeypatch.setattr(mcp_server, "_auto_refresh", lambda: None)
+        monkeypatch.setattr(mcp_server, "_result_cache", type(mcp_server._result_cache)())
+
+        with patch("src.mcp_server.hybrid_search", wraps=hybrid_search) as search:
+            first = mcp_server._do_search("netplan")
+            assert mcp_server._do_search("netplan") == first
+            assert search.call_count == 1
+
+            # A write through the connection invalidates the cached text
+            db_with_data.conn.execute(
+                "UPDATE sessions SET title = 'Renamed' WHERE id = 'test-session-1'"
+            )
+            db_with_data.conn.commit()
+            assert "Renamed" in mcp_server._do_search("netplan")
+            assert search.call_count == 2
+
+            # Recency-weighted scores are re-rendered once the hour rolls over
+            later = time.time() + mcp_server._SEARCH_CACHE_BUCKET
+            with patch("src.mcp_server.time.time", return_value=later):
+                mcp_server._do_search("netplan")
+            assert search.call_count == 3
+
+        # ... and so does a commit from another connection
+        version = db_with_data.data_version()
+        other = MemoryDB(db_with_data.db_path)
+        other.conn.execute("UPDATE sessions SET tier = 'L2'")
+        other.conn.commit()
+        other.close()
+        assert db_with_data.data_version() != version
+
+    def test_mcp_auto_refresh_ttl(self, db, monkeypatch):
+        from src import mcp_server
+
+        monkeypatch.setattr(mcp_server, "_db", db)
+        monkeypatch.setattr(mcp_server, "_last_refresh", float("-inf"))
+        ingest = MagicMock(return_value={"new_session_ids": []})
+        with patch("src.auto._should_run_daily", return_value=False), \
+                patch("src.auto.auto_ingest", ingest), \
+                patch("src.auto.promote_background"):
+            mcp_server._auto_refresh()
+            mcp_server._auto_refresh()
+            assert ingest.call_count == 1
+            mcp_server._auto_refresh(force=True)
+            assert ingest.call_count == 2
+
+    def test_mcp_refresh_reports_outcome(self, db, monkeypatch):
+        from src import mcp_server
+
+        monkeypatch.setattr(mcp_server, "_db", db)
+        result = {
+            "sessions": 2, "messages": 40,
+            "new_session_ids": [], "updated_session_ids": ["s1"],
+        }
+        with patch("src.auto._should_run_daily", return_value=False), \
+                patch("src.auto.promote_background"):
+            with patch("src.auto.auto_ingest", return_value=result):
+                assert mcp_server._do_refresh() == (
+                    "Ingested 2 new sessions (40 messages), 1 updated."
+                )
+            with patch("src.auto.auto_ingest", side_effect=OSError("disk full")):
+                assert mcp_server._do_refresh() == "Refresh failed: disk full"
+        with patch("src.auto._should_run_daily", return_value=True), \
+                patch("src.auto.daily_auto_process_background"):
+            assert "background" in mcp_server._do_refresh()
+
+
+class TestPromote:
+    def test_parse_entries(self):
+        from src.promote import _parse_entries
+
+        entries = [{"knowledge_type": "pattern", "content": "x", "confidence": 0.9}]
+        assert _parse_entries(json.dumps(entries)) == entries
+        fenced = f"Here you go [{len(entries)} entry]:\n```json\n{json.dumps(entries)}\n```\nSee [1]."
+        assert _parse_entries(fenced) == entries
+        assert _parse_entries("nothing to report") is None
+
+    def test_process_knowledge_entries(self, db_with_data):
+        from src.promote import _process_knowledge_entries
+
+        db = db_with_data
+        project = "/Users/test/Code/myproject"
+        db.upsert_project_knowledge({
+            "project_path": project,
+            "knowledge_type": "gotcha",
+            "content": "Netplan config files need chmod 600.",
+            "confidence": 0.6,
+            "evidence_count": 1,
+            "source_sessions": "[]",
+            "first_seen_at": 0,
+            "last_confirmed_at": 0,
+        })
+        db.upsert_summary({
+            "session_id": "test-session-1",
+            "summary_text": "Fixed netplan permissions",
+            "key_decisions": None,
+            "files_touched": None,
+            "commands_run": None,
+            "outcome": "completed",
+            "generated_at": int(time.time()),
+            "generator_model": "test",
+        })
+        sessions = db.list_sessions(project_path=project)
+
+        result = _process_knowledge_entries(db, [
+            {"knowledge_type": "gotcha", "content": "netplan config files need chmod 600", "confidence": 0.8},
+            {"knowledge_type": "workflow", "content": "Run tests before committing", "confidence": 0.7},
+            {"knowledge_type": "pattern", "content": "Too unsure", "confidence": 0.2},
+            "not a dict",
+        ], project, sessions)
+
+        assert (result["confirmed"], result["new"]) == (1, 1)
+        entries = {e["content"]: e for e in db.get_project_knowledge(project)}
+        assert entries["Netplan config files need chmod 600."]["evidence_count"] == 2
+        assert json.loads(entries["Run tests before committing"]["source_sessions"]) == ["test-session-1"]
+
+    def test_select_l1_context_budget(self, db):
+        from src.promote import select_l1_context
+
+        project = "/p"
+        assert select_l1_context(db, project) == ""
+        for content, confidence in (("a" * 60, 0.9), ("b" * 60, 0.8), ("c", 0.7)):
+            db.upsert_project_knowledge({
+                "project_path": project,
+                "knowledge_type": "pattern",
+                "content": content,
+                "confidence": confidence,
+                "evidence_count": 1,
+                "source_sessions": "[]",
+                "first_seen_at": 0,
+                "last_confirmed_at": 0,
+            })
+
+        # Each long line is ~20 tokens: only the first fits, and the short
+        # entry after the overflowing one is not picked up
+        lines = select_l1_context(db, project, budget_tokens=35).splitlines()
+        assert lines[0] == "## Project Knowledge (from previous sessions)"
+        assert lines[-1] == "- **[pattern]** " + "a" * 60
+        assert len(select_l1_context(db, project).splitlines()) == 5
+
+        # The estimate is len(line) // 4 of the formatted line (76 chars)
+        assert len(select_l1_context(db, project, budget_tokens=29).splitlines()) == 3
+        assert len(select_l1_context(db, project, budget_tokens=28).splitlines()) == 1
+
+    def test_promote_many(self, db):
+        from src.auto import _promote_many
+
+        def fake_promote(thread_db, project_path, model=None, backend=None):
+            assert thread_db.db_path == db.db_path and thread_db is not db
+            if project_path == "/bad":
+                raise RuntimeError("boom")
+            return {"entries": [], "confirmed": 0, "new": 0}
+
+        with patch("src.promote.promote_project_knowledge", side_effect=fake_promote):
+            results = {
+                p: (result, error)
+                for p, result, error in _promote_many(["/a", "/b", "/bad"], db_path=db.db_path)
+            }
+        assert results["/a"] == ({"entries": [], "confirmed": 0, "new": 0}, None)
+        assert results["/b"][1] is None
+        assert results["/bad"][0] is None and str(results["/bad"][1]) == "boom"
+
 
 class TestLLMBackend:
     """Tests for source-aware LLM backend dispatch."""
@@ -478,3 +1080,114 @@ class TestLLMBackend:
 
         result = call_llm("test prompt", source="claude_code", model="sonnet")
         mock_call.assert_called_once_with("test prompt", model="sonnet")
+
+    @patch("src.llm.call_claude")
+    def test_call_llm_cache(self, mock_call, tmp_path, monkeypatch):
+        """LLM_CACHE=1 answers a repeated prompt without calling the backend."""
+        monkeypatch.setenv("LLM_CACHE", "1")
+        monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+        mock_call.return_value = "response"
+
+        assert call_llm("p", backend="claude") == "response"
+        assert call_llm("p", backend="claude") == "response"
+        assert mock_call.call_count == 1
+
+        # A different model is a different key
+        call_llm("p", backend="claude", model="sonnet")
+        assert mock_call.call_count == 2
+
+        # Expired entries are misses, and are deleted on the next store
+        monkeypatch.setenv("LLM_CACHE_TTL", "-1")
+        call_llm("p", backend="claude")
+        assert mock_call.call_count == 3
+        from src import llm_cache
+
+        conn = llm_cache._conn
+        assert conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 1
+
+        # The connection is opened once per process
+        monkeypatch.delenv("LLM_CACHE_TTL")
+        call_llm("p", backend="claude")
+        assert llm_cache._conn is conn
+
+    @patch("src.llm._run_claude_cli")
+    def test_call_claude_full_reads_transcript_once(self, mock_run, tmp_path):
+        from src import llm
+
+        project = tmp_path / "projects" / "-tmp-proj"
+        project.mkdir(parents=True)
+        (project / "sid-1.jsonl").write_text(
+            json.dumps({
+                "type": "assistant", "sessionId": "sid-1",
+                "message": {"role": "assistant", "model": "haiku", "content": [
+                    {"type": "thinking", "thinking": "hmm"},
+                    {"type": "text", "text": "done"},
+                ]},
+            }) + "\n"
+        )
+        (tmp_path / "traces").mkdir()
+        mock_run.return_value = ("done", "sid-1")
+
+        with patch("src.llm._read_jsonl", wraps=llm._read_jsonl) as reader:
+            response = llm.call_claude_full(
+                "p", session_id="sid-1", projects_base=tmp_path / "projects",
+                traces_dir=tmp_path / "traces",
+            )
+
+        assert reader.call_count == 1
+        assert response.text == "done" and response.thinking == ["hmm"]
+        trace = json.loads(Path(response.jsonl_path).read_text())
+        assert [t["type"] for t in trace["turns"]] == ["thinking", "text"]
+        assert len(response.raw_messages) == 1
+
+        lite = llm.call_claude_full(
+            "p", session_id="sid-1", projects_base=tmp_path / "projects",
+            traces_dir=tmp_path / "traces", lite=True,
+        )
+        assert lite.text == "done" and lite.raw_messages == []
+
+    def test_newest_file(self, tmp_path):
+        from src.llm import _newest_file
+
+        for name, mtime in (("a/rollout-1.jsonl", 100), ("b/rollout-2.jsonl", 300),
+                            ("b/rollout-3.jsonl", 200), ("b/other.jsonl", 900)):
+            path = tmp_path / name
+            path.parent.mkdir(exist_ok=True)
+            path.write_text("")
+            os.utime(path, (mtime, mtime))
+
+        assert _newest_file(tmp_path, "rollout-*.jsonl", 150).name == "rollout-2.jsonl"
+        assert _newest_file(tmp_path, "rollout-*.jsonl", 300).name == "rollout-2.jsonl"
+        assert _newest_file(tmp_path, "rollout-*.jsonl", 301) is None
+
+    def test_run_claude_cli_drains_stderr(self, tmp_path, monkeypatch):
+        import sys
+        from src.llm import _run_claude_cli
+
+        # A CLI that overfills the stderr pipe before writing its result
+        fake = tmp_path / "claude"
+        fake.write_text(
+            f"#!{sys.executable}\n"
+            "import json, sys\n"
+            "sys.stderr.write('x' * 1_000_000)\n"
+            "print(json.dumps({'type': 'result', 'result': 'ok'}))\n"
+        )
+        fake.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+        assert _run_claude_cli("p", session_id="sid-1") == ("ok", "sid-1")
+
+    def test_find_session_jsonl_remembers_project_dir(self, tmp_path):
+        from src.llm import _find_session_jsonl
+
+        for project in ("-a", "-b"):
+            (tmp_path / project).mkdir()
+        (tmp_path / "-b" / "s1.jsonl").write_text("")
+        (tmp_path / "-b" / "s2.jsonl").write_text("")
+
+        assert _find_session_jsonl("s1", tmp_path) == tmp_path / "-b" / "s1.jsonl"
+        with patch("src.llm.os.scandir", side_effect=AssertionError("rescanned")):
+            assert _find_session_jsonl("s1", tmp_path) == tmp_path / "-b" / "s1.jsonl"
+            assert _find_session_jsonl("s2", tmp_path) == tmp_path / "-b" / "s2.jsonl"
+        (tmp_path / "-b" / "s1.jsonl").unlink()
+        assert _find_session_jsonl("s1", tmp_path) is None